@@ -1,10 +1,30 @@
 import streamlit as st
 import pandas as pd
 import os
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
-from groq import Groq
-from fuzzywuzzy import process
 from dotenv import load_dotenv
+from groq import APIStatusError
+from service_matching import STOPWORDS, MatchCache, match_exact, query_cache_key
+from bm25_matching import match_bm25
+from semantic_matching import match_semantic
+from phonetic_matching import match_phonetic
+from service_catalog import ServiceCatalog, compile_catalog, get_service_catalog
+from cascade import CascadeStats, Stage, run_cascade
+from book_recommendations import (SKILL_LEVELS, books_fingerprint, build_book_index,
+                                  parse_interest, recommend)
+from chat_context import build_context
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from explanation_cache import CACHE_PATH as EXPLANATION_CACHE_PATH, ExplanationCache
+from hedging import Hedger
+from llm_client import ManagedGroq, capped_timeout
+from model_routing import RoutingStats, classify, complete_routed
+from rate_limit import PRIORITIES, GroqRateLimiter
+from prewarm import Prewarmer
+from response_cache import SemanticResponseCache, depends_on_context
+from single_flight import SingleFlight
+from streaming import CompletionStats, await_streamed, chat_completion, throttled
 
 # ----------------------------- #
 # Initialization & Configuration
@@ -18,8 +38,147 @@ def load_css():
         st.error("CSS stylesheet not found!")
 
 load_dotenv()
+logger = logging.getLogger(__name__)
+
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-groq_client = Groq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
+# Point at a local stand-in (benchmarks/groq_standin.py) for offline load tests
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
+# HTTP connection pool shared by every session's Groq calls
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "20"))
+GROQ_MAX_KEEPALIVE = int(os.getenv("GROQ_MAX_KEEPALIVE", "10"))
+GROQ_KEEPALIVE_S = float(os.getenv("GROQ_KEEPALIVE_S", "30"))
+# Client-side limits, corrected from Groq's x-ratelimit-* headers as they arrive
+GROQ_REQUESTS_PER_MIN = float(os.getenv("GROQ_REQUESTS_PER_MIN", "30"))
+GROQ_TOKENS_PER_MIN = float(os.getenv("GROQ_TOKENS_PER_MIN", "6000"))
+# Longest a call waits for a rate-limit slot before failing (None: no limit)
+RATE_LIMIT_MAX_WAIT_S = {"chat": 20, "explanation": 10, "recommendations": 10, "prewarm": None}
+# Circuit breaker: after GROQ_BREAKER_FAILURES consecutive failures (or streamed
+# first tokens slower than GROQ_SLOW_CALL_MS) Groq calls fail fast for
+# GROQ_BREAKER_OPEN_S and the chat answers from local data only
+GROQ_BREAKER_FAILURES = int(os.getenv("GROQ_BREAKER_FAILURES", "3"))
+GROQ_SLOW_CALL_MS = float(os.getenv("GROQ_SLOW_CALL_MS", "10000"))
+GROQ_BREAKER_OPEN_S = float(os.getenv("GROQ_BREAKER_OPEN_S", "30"))
+# Opt-in hedging of interactive calls: a call with no first token after the
+# HEDGE_PERCENTILE-th recent time to first token is sent again and the
+# faster copy kept; at most HEDGE_MAX_RATIO of recent calls are hedged
+HEDGE_REQUESTS = os.getenv("HEDGE_REQUESTS", "0") == "1"
+HEDGED_PROFILES = ("chat", "explanation")
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_DELAY_MS = float(os.getenv("HEDGE_MIN_DELAY_MS", "300"))
+HEDGE_MAX_RATIO = float(os.getenv("HEDGE_MAX_RATIO", "0.1"))
+HEDGE_WORKERS = int(os.getenv("HEDGE_WORKERS", "16"))
+
+@st.cache_resource
+def get_managed_groq():
+    """Process-wide Groq clients over one pooled, kept-alive connection set"""
+    if not GROQ_API_KEY:
+        return None
+    return ManagedGroq(GROQ_API_KEY, max_connections=GROQ_MAX_CONNECTIONS,
+                       max_keepalive_connections=GROQ_MAX_KEEPALIVE,
+                       keepalive_expiry_s=GROQ_KEEPALIVE_S, base_url=GROQ_BASE_URL,
+                       limiter=GroqRateLimiter(GROQ_REQUESTS_PER_MIN, GROQ_TOKENS_PER_MIN))
+
+managed_groq = get_managed_groq()
+groq_client = managed_groq.client if managed_groq else None
+
+def groq_for(profile):
+    """Groq client with the timeout/retry profile for one kind of call"""
+    return managed_groq.profile(profile) if managed_groq else groq_client
+
+def rate_limit_wait(profile):
+    """Estimated seconds before a new call of this kind gets a rate-limit slot"""
+    if not managed_groq or not managed_groq.limiter:
+        return 0.0
+    return managed_groq.limiter.estimate_wait(PRIORITIES[profile])
+
+@st.cache_resource
+def get_circuit_breaker():
+    """Process-wide breaker in front of every Groq call"""
+    return CircuitBreaker(failure_threshold=GROQ_BREAKER_FAILURES,
+                          slow_call_ms=GROQ_SLOW_CALL_MS, open_s=GROQ_BREAKER_OPEN_S)
+
+@st.cache_resource
+def get_hedger():
+    """Process-wide hedging of slow interactive calls, with one global hedge cap"""
+    pool = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="groq-hedge")
+    return Hedger(pool, percentile=HEDGE_PERCENTILE, min_delay_ms=HEDGE_MIN_DELAY_MS,
+                  max_hedge_ratio=HEDGE_MAX_RATIO)
+
+def groq_outage(error):
+    """Whether an error suggests Groq is down, as opposed to rejecting this request"""
+    return not isinstance(error, APIStatusError) or error.status_code >= 500
+
+def groq_completion(profile, on_text=None, **create_kwargs):
+    """Chat completion text through the shared client, breaker, rate limiter and coalescing"""
+    return chat_completion(
+        groq_for(profile), label=profile, on_text=on_text, stats=get_completion_stats(),
+        flights=get_request_flights(),
+        limiter=managed_groq.limiter if managed_groq else None,
+        priority=PRIORITIES[profile], max_wait_s=RATE_LIMIT_MAX_WAIT_S[profile],
+        breaker=get_circuit_breaker(), is_failure=groq_outage,
+        hedger=get_hedger() if HEDGE_REQUESTS and profile in HEDGED_PROFILES else None,
+        **create_kwargs
+    )
+
+SERVICES_FILE = os.getenv("LIBRARY_SERVICES_FILE", "library_services.json")
+
+# Query cascade: local stages tried cheapest first, then the LLM. Each stage
+# has a confidence threshold (in its own score units) and a latency budget.
+# Tuned with benchmarks/bench_service_matching.py: below 90, WRatio matches
+# most out-of-scope questions, so fuzzy runs last and only catches typos.
+CASCADE_CONFIG = {
+    "exact":    {"threshold": 100, "budget_ms": 1},    # name/keyword/alias lookup
+    "phonetic": {"threshold": 75,  "budget_ms": 2},    # sound-alike and Banglish spellings
+    "bm25":     {"threshold": 3.0, "budget_ms": 5},    # sparse BM25 over info text
+    "semantic": {"threshold": 50,  "budget_ms": 10},   # local embedding cosine
+    "fuzzy":    {"threshold": 90,  "budget_ms": 25},   # fuzzywuzzy WRatio
+    "llm":      {"threshold": None, "budget_ms": 30000},
+    "offline":  {"threshold": None, "budget_ms": 25},      # used while Groq is unavailable
+}
+# Local stages to run, "+"-separated; the LLM always comes last
+CASCADE_STAGES = os.getenv("CASCADE_STAGES", "exact+phonetic+bm25+semantic+fuzzy")
+MAX_SERVICE_CARDS = 3  # services shown when several share the matched keyword
+MATCH_CACHE_SIZE = 2048  # distinct normalized queries kept by the match cache
+# AI overviews and book blurbs carry service or catalog context, which the
+# router sends to the large model; their caches are keyed by that model
+CONTEXT_ROUTE = classify("", context_attached=True)
+# AI overviews are cached on disk per (service, prompt version, model); bump
+# the version whenever the prompt in generate_ai_explanation changes
+EXPLANATION_MODEL = CONTEXT_ROUTE.model
+EXPLANATION_PROMPT_VERSION = 1
+# Book recommendations are ranked locally from books.csv; the LLM only adds a
+# one-line blurb to the top RECOMMENDATION_BLURBS books (0: never), cached on
+# disk per (title, interest cluster) like the AI overviews
+RECOMMENDATION_LIMIT = 5
+RECOMMENDATION_BLURBS = int(os.getenv("RECOMMENDATION_BLURBS", "3"))
+BLURB_MODEL = CONTEXT_ROUTE.model
+BLURB_PROMPT_VERSION = 1
+BLURB_CACHE_PATH = os.getenv("BLURB_CACHE_PATH", os.path.join(
+    os.path.dirname(EXPLANATION_CACHE_PATH), "blurbs.sqlite3"))
+# Optional background warm-up of the explanation cache at process start
+PREWARM_EXPLANATIONS = os.getenv("PREWARM_EXPLANATIONS") == "1"
+PREWARM_WORKERS = int(os.getenv("PREWARM_WORKERS", "4"))
+PREWARM_RATE_PER_MIN = float(os.getenv("PREWARM_RATE_PER_MIN", "20"))  # leave quota for users
+# AI overviews are fetched on worker threads while the static card is shown;
+# one not ready after OVERVIEW_TIMEOUT_S is dropped from the answer
+OVERVIEW_WORKERS = int(os.getenv("OVERVIEW_WORKERS", "4"))
+OVERVIEW_TIMEOUT_S = float(os.getenv("OVERVIEW_TIMEOUT_S", "15"))
+# LLM fallback answers are reused for near-duplicate questions (embedding
+# cosine >= RESPONSE_CACHE_SIMILARITY, same numbers, negations and days)
+# unless the chat context matters; tuned with benchmarks/bench_response_cache.py
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+RESPONSE_CACHE_TTL_S = float(os.getenv("RESPONSE_CACHE_TTL_S", 6 * 3600))
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.8"))
+RESPONSE_CACHE_EVICTION = os.getenv("RESPONSE_CACHE_EVICTION", "lru")  # or "lfu"
+# Chat history sent with LLM fallback queries is packed into this many
+# (estimated) tokens; the newest CONTEXT_VERBATIM_MESSAGES stay unsummarized
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "600"))
+CONTEXT_MAX_MESSAGES = 10
+CONTEXT_VERBATIM_MESSAGES = 2
+# Stream LLM tokens into the chat as they arrive instead of waiting for the whole answer
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "1") == "1"
+# Cross-check trigram-pruned matches against the exhaustive scan (slower)
+VERIFY_TRIGRAM_PRUNING = os.getenv("VERIFY_TRIGRAM_PRUNING") == "1"
 
 # ----------------------------- #
 # Data Loading
@@ -38,261 +197,290 @@ due_dates = {}
 # ----------------------------- #
 # Library Services Configuration
 # ----------------------------- #
-library_services = {
-    # ... [Keep the exact same library_services dictionary from original code] ...
-    "research consultation": {
-        "url": "https://library.daffodilvarsity.edu.bd/research-consultation",
-        "info": "Contact the library for research consultation details.",
-        "keywords": ["research", "thesis", "consultation", "academic support"]
-    },
-    "resources acquisition": {
-        "url": "https://docs.google.com/document/d/1j7KyQiI1Fivqzi4MPjKNQeTMWll932xw/edit",
-        "info": "Acquire books, journals, and periodicals through the library website.",
-        "keywords": ["acquisition", "ordering", "materials request"]
-    },
-    "catalog search service (opac)": {
-        "url": "http://opac.daffodilvarsity.edu.bd/",
-        "info": "Search for books using the OPAC system.",
-        "keywords": ["catalog", "search", "database", "OPAC"],
-        "contact": {
-            "Dr. Md. Milan Khan": {
-                "email": "librarian@daffodilvarsity.edu.bd",
-                "phone": "01713493004",
-                "ip_phone": "65266"
-            },
-            "Md. Rashed Nizami": {
-                "email": "library2@daffodilvarsity.edu.bd",
-                "phone": "+8801847334849",
-                "ip_phone": "65269"
-            }
-        }
-    },
-    "library membership": {
-        "url": "https://library.daffodilvarsity.edu.bd",
-        "info": "Automatic membership for DIU students",
-        "keywords": ["membership", "access", "privileges", "registration"]
-    },
-    "library circulation service": {
-        "url": "http://opac.daffodilvarsity.edu.bd/",
-        "info": "Issue, return, and renew books and journals.",
-        "keywords": ["circulation", "borrowing", "returns", "renewals"]
-    },
-    "koha": {
-        "url": "http://koha.daffodilvarsity.edu.bd/",
-        "info": "Integrated library system for circulation.",
-        "keywords": ["ILS", "management system", "automation"]
-    },
-    "e-library": {
-        "url": "https://archives.daffodilvarsity.edu.bd/login",
-        "info": "Access digital resources through the e-library portal.",
-        "keywords": ["digital", "e-resources", "online access", "e-books"]
-    },
-    "award": {
-        "url": "https://archives.daffodilvarsity.edu.bd/login",
-        "info": (
-            "### *DIU Library Award – Library Excellence Award*  \n\n"
-            "Daffodil International University (DIU) *Central Library* recognizes students who actively engage with library resources through the *Library Excellence Award*. "
-            "This award encourages students to develop strong reading and research habits.  \n\n"
-            "#### *1. Purpose of the Award:*  \n"
-            "- To recognize and reward students who make the best use of DIU library resources  \n"
-            "- To encourage academic excellence through reading and research  \n"
-            "- To create a reading-friendly culture among students  \n\n"
-            "#### *2. Award Categories (Past Examples):*  \n"
-            "- *Best Reader Award:* Given to students who borrow and read the most books  \n"
-            "- *Best Researcher Award:* Awarded to those who utilize the library's research materials effectively  \n"
-            "- *Active Library User Award:* For students who engage in various library activities  \n\n"
-            "#### *3. How to Qualify for the Award:*  \n"
-            "- Frequently borrow and read books from the DIU Central Library  \n"
-            "- Participate in library activities and research initiatives  \n"
-            "- Maintain a record of active engagement with library resources  \n\n"
-            "#### *4. Recent Award Ceremony:*  \n"
-            "- Took place on *November 20, 2024* at **Kabi Nazrul Eduplex, DIU Library**  \n\n"
-            "#### *5. Benefits of Winning:*  \n"
-            "- Official recognition and certificate  \n"
-            "- Featured on DIU Library platforms  \n"
-            "- Academic motivation boost  \n\n"
-            "#### *6. Stay Updated:*  \n"
-            "- Visit [DIU Library Website](https://library.daffodilvarsity.edu.bd/)  \n"
-            "- Follow [DIU Library Facebook](https://www.facebook.com/DIULIBRARY/)  \n"
-            "- Contact library staff for announcements"
-        ),
-        "keywords": ["awards", "recognition", "achievement", "library excellence"]
-    },
-    "voice library": {
-        "url": "https://voice.library.daffodilvarsity.edu.bd/",
-        "info": "Access audio resources and spoken content.",
-        "keywords": ["audio", "podcasts", "narration", "accessibility"]
-    },
-    "item issue, return, renew": {
-        "url": "http://koha.daffodilvarsity.edu.bd/",
-        "info": "Manage item circulation processes.",
-        "keywords": ["circulation", "transactions", "loans", "returns"]
-    },
-    "resignation/study leave": {
-        "url": "https://pd.daffodilvarsity.edu.bd/web#action=2278&cids=1&menu_id=1906&model=clearance.academic&view_type=list",
-        "info": "Submit clearance requests for leaves.",
-        "keywords": ["clearance", "HR", "administration", "process"]
-    },
-    "transcript/certificate": {
-        "url": "http://192.168.10.14:8090/login",
-        "info": "Access academic records and certificates.",
-        "keywords": ["documents", "records", "verification", "academia"]
-    },
-    "library clearance service": {
-        "url": None,
-        "info": "Contact library staff for clearance services.",
-        "keywords": ["clearance", "administration", "process"],
-        "contact": {
-            "Mr. Md. Abdul Monnaf Sarker": {
-                "email": "library7@daffodilvarsity.edu.bd",
-                "phone": "01729151416",
-                "ip_phone": "65271"
-            }
-        }
-    },
-    "plagiarism checking & defense": {
-        "url": "https://library.daffodilvarsity.edu.bd/service/internship-portal-guideline",
-        "info": "Check academic integrity and submit defenses.",
-        "keywords": ["academic integrity", "checking", "originality"]
-    },
-    "admission cancel": {
-        "url": None,
-        "info": "Process admission cancellations.",
-        "keywords": ["admissions", "cancellation", "process"]
-    },
-    "library information literacy program": {
-        "url": "https://www.appsheet.com/start/67d7805e-e5dd-4008-a849-19e297b3adaa?refresh=1&platform=desktop#viewStack[0][identifier][Type]=Control&viewStack[0][identifier][Name]=Coordination%20Officer&appName=LibraryDashboard-860092393",
-        "info": "Participate in information literacy training.",
-        "keywords": ["literacy", "training", "education", "skills"]
-    },
-    "internship portal training": {
-        "url": "https://internship.daffodilvarsity.edu.bd/index.php?app=home",
-        "info": "Access internship management resources.",
-        "keywords": ["internship", "training", "career"]
-    },
-    "faculty publications": {
-        "url": "http://dspace.daffodilvarsity.edu.bd:8080/",
-        "info": "Access faculty research publications.",
-        "keywords": ["research", "publications", "academia"]
-    },
-    "institutional repository service": {
-        "url": "http://dspace.daffodilvarsity.edu.bd:8080/",
-        "info": "Access institutional research repository.",
-        "keywords": ["repository", "research", "archives"]
-    },
-    "student research paper": {
-        "url": "https://zenodo.org/me/uploads?q=&l=list&p=1&s=10&sort=newest",
-        "info": "Manage student research publications.",
-        "keywords": ["research", "publications", "student work"]
-    },
-    "newspaper & periodical service": {
-        "url": None,
-        "info": "Access current news and periodicals.",
-        "keywords": ["news", "periodicals", "current affairs"]
-    },
-    "bag counter/locker": {
-        "url": "https://library.daffodilvarsity.edu.bd/content/lockers",
-        "info": "Access library storage facilities.",
-        "keywords": ["storage", "security", "facilities"]
-    },
-    "lost & found at library": {
-        "url": None,
-        "info": "Report or retrieve lost items.",
-        "keywords": ["lost items", "recovery", "security"]
-    },
-    "turnitin administrative service": {
-        "url": "https://www.turnitin.com/login_page.asp?lang=en_us",
-        "info": "Access plagiarism checking services.",
-        "keywords": ["plagiarism", "checking", "originality"]
-    },
-    "remote access using myathens": {
-        "url": "https://library.daffodilvarsity.edu.bd/service/remote-access",
-        "info": "Access resources remotely.",
-        "keywords": ["remote access", "off-campus", "VPN"]
-    },
-    "e-book": {
-        "url": "https://archives.daffodilvarsity.edu.bd/service/ebooks",
-        "info": "Access electronic books.",
-        "keywords": ["e-books", "digital", "reading"]
-    },
-    "e-journal": {
-        "url": "https://library.daffodilvarsity.edu.bd/public/database",
-        "info": "Access electronic journals.",
-        "keywords": ["e-journals", "research", "periodicals"]
-    },
-    "blc for library use": {
-        "url": "https://elearn.daffodilvarsity.edu.bd/login/index.php",
-        "info": "Access blended learning content.",
-        "keywords": ["learning", "online", "education"]
-    },
-    "cyber zone service": {
-        "url": None,
-        "info": "Access computer facilities.",
-        "keywords": ["computers", "internet", "facilities"]
-    },
-    "library venue booking": {
-        "url": None,
-        "info": "Book library spaces.",
-        "keywords": ["spaces", "booking", "facilities"]
-    },
-    "digital object identifier (doi) implementation service": {
-        "url": None,
-        "info": "Manage digital identifiers.",
-        "keywords": ["DOI", "research", "publications"]
-    },
-    "student management service": {
-        "url": "https://ejms.daffodilvarsity.edu.bd/",
-        "info": "Manage student services.",
-        "keywords": ["administration", "student affairs", "management"]
-    }
-}
+def load_services():
+    """Compiled service catalog; edits to the data file are picked up without a restart"""
+    try:
+        return get_service_catalog(SERVICES_FILE)
+    except (OSError, ValueError) as e:
+        st.error(f"❌ Error loading '{SERVICES_FILE}': {e}")
+        return ServiceCatalog(path=SERVICES_FILE, mtime_ns=0, file_hash="",
+                              **compile_catalog({}))
+
+# Indexes come precompiled from the catalog cache; this is one stat() per rerun
+catalog = load_services()
+library_services = catalog.services
+service_index = catalog.service_index
+bm25_index = catalog.bm25_index
+semantic_index = catalog.semantic_index
+phonetic_index = catalog.phonetic_index
+
+@st.cache_resource
+def get_match_cache():
+    """Process-wide cache of service matches, shared by all sessions"""
+    return MatchCache(maxsize=MATCH_CACHE_SIZE)
+
+@st.cache_resource
+def get_cascade_stats():
+    """Process-wide counters of which cascade stage answered"""
+    return CascadeStats()
+
+@st.cache_resource
+def get_completion_stats():
+    """Process-wide time-to-first-token and total latency of LLM calls"""
+    return CompletionStats()
+
+@st.cache_resource
+def get_routing_stats():
+    """Process-wide small/large model routing counters"""
+    return RoutingStats()
+
+@st.cache_resource
+def get_request_flights():
+    """Process-wide coalescing of identical in-flight Groq requests across sessions"""
+    return SingleFlight()
+
+@st.cache_resource(max_entries=1)
+def get_response_cache(catalog_fingerprint):
+    """Process-wide semantic cache of LLM fallback answers
+
+    Keyed by the catalog so an edited catalog starts from an empty cache
+    embedded with its own n-gram weights.
+    """
+    return SemanticResponseCache(
+        semantic_index.bucket_weights, maxsize=RESPONSE_CACHE_SIZE,
+        ttl_s=RESPONSE_CACHE_TTL_S, threshold=RESPONSE_CACHE_SIMILARITY,
+        eviction=RESPONSE_CACHE_EVICTION
+    )
+
+@st.cache_resource
+def get_explanation_cache():
+    """Disk-backed AI explanation cache, shared with other worker processes"""
+    return ExplanationCache()
+
+@st.cache_resource
+def get_blurb_cache():
+    """Disk-backed recommendation blurbs, keyed by "<title> | <interest cluster>" """
+    return ExplanationCache(BLURB_CACHE_PATH)
+
+@st.cache_resource(max_entries=1)
+def get_book_index(fingerprint, _books):
+    """Embedded book catalog; rebuilt only when books.csv's titles or shelves change"""
+    return build_book_index(_books)
+
+@st.cache_resource
+def get_overview_pool():
+    """Worker threads that fetch AI overviews off the script thread"""
+    return ThreadPoolExecutor(max_workers=OVERVIEW_WORKERS, thread_name_prefix="ai-overview")
+
+@st.cache_resource
+def get_explanation_prewarmer():
+    """Background fill of the explanation cache; started once per process"""
+    cache = get_explanation_cache()
+    pending = cache.missing(library_services, EXPLANATION_PROMPT_VERSION, EXPLANATION_MODEL)
+
+    def warm(service_name):
+        # Another worker process may have filled it since the pool was sized
+        if not cache.missing([service_name], EXPLANATION_PROMPT_VERSION, EXPLANATION_MODEL):
+            return False
+        request_ai_explanation(service_name, cache, profile="prewarm")
+        return True
+
+    return Prewarmer(pending, warm, max_workers=PREWARM_WORKERS,
+                     rate_per_s=PREWARM_RATE_PER_MIN / 60, name="explanation-prewarm").start()
 
 # ----------------------------- #
 # Core Functions
 # ----------------------------- #
-def generate_ai_explanation(service_name):
-    """Generate service explanation using Groq AI"""
-    if not GROQ_API_KEY:
-        return "⚠️ AI explanations require Groq API key"
-    
+def request_ai_explanation(service_name, cache, on_text=None, profile="explanation"):
+    """Ask Groq for a service explanation and cache it; raises on API errors"""
     prompt = f"""As a professional librarian, provide comprehensive details about {service_name} 
     at DIU Library. Include: purpose, benefits, access methods, requirements, and related services."""
     
-    try:
-        response = groq_client.chat.completions.create(
-            model="llama3-70b-8192",
+    explanation = complete_routed(
+        lambda model, stream: groq_completion(
+            profile, on_text=stream,
+            model=model,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.4
+        ),
+        CONTEXT_ROUTE, get_routing_stats(), on_text
+    )
+    cache.put(service_name, EXPLANATION_PROMPT_VERSION, EXPLANATION_MODEL, explanation)
+    return explanation
+
+def generate_ai_explanation(service_name, on_text=None):
+    """AI overview of a service, or None when it is unavailable
+
+    Served from the cache when possible; otherwise fetched on a worker
+    thread, with on_text(text_so_far) called from this thread as tokens
+    stream in. Errors and timeouts are logged and yield None, so the
+    answer degrades to the static service card.
+    """
+    cache = get_explanation_cache()
+    cached = cache.get(service_name, EXPLANATION_PROMPT_VERSION, EXPLANATION_MODEL)
+    if cached is not None:
+        return cached
+    if not GROQ_API_KEY:
+        return None
+    
+    try:
+        # A timed-out fetch keeps running and still fills the cache for next time
+        return await_streamed(
+            get_overview_pool(),
+            lambda on_text: request_ai_explanation(service_name, cache, on_text),
+            on_text=on_text, timeout_s=OVERVIEW_TIMEOUT_S
         )
-        return response.choices[0].message.content
     except Exception as e:
-        return f"⚠️ AI explanation error: {str(e)}"
+        logger.warning("AI overview for %r unavailable: %s", service_name, e)
+        return None
+
+def service_card(service_name):
+    """Static markdown lines describing one service"""
+    service = library_services[service_name]
+    lines = [
+        f"**📚 {service_name.title()} Service**",
+        service['info']
+    ]
+    if service.get('url'):
+        lines.append(f"**🔗 Access URL:** {service['url']}")
+    return lines
+
+# ----------------------------- #
+# Query Cascade
+# ----------------------------- #
+def exact_stage(query):
+    return match_exact(service_index, query_cache_key(query))
+
+def phonetic_stage(query):
+    return get_match_cache().match(phonetic_index, query, matcher=match_phonetic,
+                                   score_cutoff=CASCADE_CONFIG["phonetic"]["threshold"])
+
+def fuzzy_stage(query):
+    return get_match_cache().match(service_index, query,
+                                   score_cutoff=CASCADE_CONFIG["fuzzy"]["threshold"],
+                                   verify=VERIFY_TRIGRAM_PRUNING)
+
+def bm25_stage(query):
+    return get_match_cache().match(bm25_index, query, matcher=match_bm25,
+                                   score_cutoff=CASCADE_CONFIG["bm25"]["threshold"])
+
+def semantic_stage(query):
+    return get_match_cache().match(semantic_index, query, matcher=match_semantic,
+                                   score_cutoff=CASCADE_CONFIG["semantic"]["threshold"])
+
+def llm_stage(query, on_text=None):
+    if not get_circuit_breaker().allows_calls():
+        return None  # fail fast; the offline stage answers instead
+    return generate_groq_response(query, timeout=CASCADE_CONFIG["llm"]["budget_ms"] / 1000,
+                                  on_text=on_text)
+
+def offline_stage(query):
+    return offline_answer(query)
+
+LOCAL_STAGES = {
+    "exact": exact_stage,
+    "phonetic": phonetic_stage,
+    "fuzzy": fuzzy_stage,
+    "bm25": bm25_stage,
+    "semantic": semantic_stage,
+}
+
+def cascade_stages(include_llm=True, names=None, on_text=None):
+    """Configured cascade stages, cheapest first; on_text receives streamed LLM text"""
+    names = names or CASCADE_STAGES
+    stages = [
+        Stage(name, LOCAL_STAGES[name], CASCADE_CONFIG[name]["budget_ms"])
+        for name in (n.strip() for n in names.split("+"))
+    ]
+    if include_llm:
+        stages.append(Stage("llm", lambda query: llm_stage(query, on_text),
+                            CASCADE_CONFIG["llm"]["budget_ms"], required=True))
+        stages.append(Stage("offline", offline_stage, CASCADE_CONFIG["offline"]["budget_ms"],
+                            required=True))
+    return stages
+
+def find_service_match(user_input):
+    """Best service match from the local cascade stages, or None"""
+    return run_cascade(cascade_stages(include_llm=False), user_input, get_cascade_stats()).answer
+
+def render_service_match(match, on_text=None):
+    """Markdown answer for a ServiceMatch
+
+    With on_text, the static cards are drawn at once and redrawn with the
+    AI overview as it streams in.
+    """
+    matched_service = match.service
+    card = service_card(matched_service)
+
+    # Services sharing the matched keyword are shown in the same answer
+    related = []
+    if match.services[1:MAX_SERVICE_CARDS]:
+        related.append(f"**Other services matching \"{match.term}\":**")
+        for service_name in match.services[1:MAX_SERVICE_CARDS]:
+            related.extend(service_card(service_name))
+
+    def compose(overview=None):
+        overview_lines = [f"\n**🤖 AI Overview:**\n{overview}"] if overview else []
+        return "\n\n".join(card + overview_lines + related)
+
+    if not GROQ_API_KEY:
+        return compose()
+    if on_text:
+        on_text(compose())
+    stream = (lambda text: on_text(compose(text))) if on_text else None
+    return compose(generate_ai_explanation(matched_service, stream))
+
+def answer_query(user_input, on_text=None):
+    """Run the full cascade; returns (response markdown, answering stage)
+
+    on_text(markdown_so_far) is called while LLM text streams in.
+    """
+    result = run_cascade(cascade_stages(on_text=on_text), user_input, get_cascade_stats())
+    if result.stage is None:
+        return "⚠️ Sorry, I couldn't find an answer to that.", None
+    if result.stage in ("llm", "offline"):
+        return result.answer, result.stage
+    return render_service_match(result.answer, on_text), result.stage
+
+def catalog_books(query, limit=5):
+    """Books whose title, author or genre shares a word with the query"""
+    words = set(query_cache_key(query).split()) - STOPWORDS
+    if books.empty or not words:
+        return books.iloc[0:0]
+    text = (books["Title"] + " " + books["Author"] + " " + books["Genre"]).str.casefold()
+    hits = text.str.findall(r"\w+").apply(lambda tokens: len(words.intersection(tokens)))
+    found = books.assign(_hits=hits)[hits > 0]
+    return found.sort_values("_hits", ascending=False, kind="stable").head(limit)
+
+def offline_answer(query):
+    """Local-only answer while the AI assistant is unreachable
+
+    The closest library service (at any BM25 score) and matching catalog
+    books, or a hint on what can be answered offline.
+    """
+    response = ["⚠️ The AI assistant is temporarily unavailable, so this answer "
+                "comes from the library's own records."]
+    match = match_bm25(bm25_index, query)
+    if match:
+        response.extend(service_card(match.service))
+    found = catalog_books(query)
+    if not found.empty:
+        response.append("**📖 Matching books in the library catalog:**")
+        response.append("\n".join(
+            f"- *{b.Title}* by {b.Author} ({b.Location}, "
+            f"{'available' if b.Available == 'Yes' else 'on loan'})"
+            for b in found.itertuples()
+        ))
+    if len(response) == 1:
+        response.append("Ask about a library service, such as renewing a book, "
+                        "library clearance or Turnitin, or search for a book title.")
+    return "\n\n".join(response)
 
 def handle_service_query(user_input):
-    """Process user query with fuzzy matching"""
-    service_terms = []
-    for service_name, service_data in library_services.items():
-        service_terms.append((service_name, service_name))
-        service_terms.extend((keyword, service_name) for keyword in service_data.get('keywords', []))
-    
-    all_terms = [term for term, _ in service_terms]
-    best_term, score = process.extractOne(user_input, all_terms)
-    
-    if score > 55:
-        matched_service = next((s for t, s in service_terms if t == best_term), None)
-        if matched_service:
-            service = library_services[matched_service]
-            response = [
-                f"**📚 {matched_service.title()} Service**",
-                service['info']
-            ]
-            
-            if service.get('url'):
-                response.append(f"**🔗 Access URL:** {service['url']}")
-            if GROQ_API_KEY:
-                response.append(f"\n**🤖 AI Overview:**\n{generate_ai_explanation(matched_service)}")
-            
-            return "\n\n".join(response)
+    """Process user query with the local service matchers"""
+    match = find_service_match(user_input)
+    if match:
+        return render_service_match(match)
     return None
 
 # ----------------------------- #
@@ -316,29 +504,142 @@ def chat_interface():
     if user_query := st.chat_input("Ask about library services:"):
         st.session_state.chat_history.append({"role": "user", "content": user_query})
         
-        with st.spinner("🔍 Searching library resources..."):
-            response = handle_service_query(user_query) or generate_groq_response(user_query)
-            st.session_state.chat_history.append({"role": "assistant", "content": response})
+        with st.chat_message("user"):
+            st.markdown(f'<div class="user-message">{user_query}</div>', unsafe_allow_html=True)
+        with st.chat_message("assistant"):
+            placeholder = st.empty()
+            wait_s = rate_limit_wait("chat")
+            if wait_s >= 1:
+                placeholder.caption(f"⏳ High demand: AI answers are queued for about {wait_s:.0f} s")
+            on_text = throttled(lambda text: placeholder.markdown(
+                f'<div class="assistant-message">{text} ▌</div>', unsafe_allow_html=True
+            )) if STREAM_RESPONSES else None
+            with st.spinner("🔍 Searching library resources..."):
+                response, stage = answer_query(user_query, on_text)
+            st.session_state.chat_history.append(
+                {"role": "assistant", "content": response, "stage": stage}
+            )
         
         # Rerun to show new messages
         st.rerun()
 
-def generate_groq_response(query):
-    """Fallback to Groq for general queries"""
+def generate_groq_response(query, timeout=None, on_text=None):
+    """Fallback to Groq for general queries; on_text receives streamed tokens
+
+    Answers to self-contained questions come from, and go to, the semantic
+    response cache; follow-ups that lean on the conversation bypass it.
+    """
+    cache = get_response_cache(semantic_index.fingerprint)
+    use_cache = not depends_on_context(query, st.session_state.chat_history)
+    if not use_cache:
+        cache.record_bypass()
+    elif (cached := cache.get(query)) is not None:
+        return cached
+
     try:
+        # Overviews, URLs and older turns are trimmed so prompt size stays flat
+        history, context_tokens = build_context(
+            st.session_state.chat_history, CONTEXT_TOKEN_BUDGET, query=query,
+            max_messages=CONTEXT_MAX_MESSAGES, verbatim_messages=CONTEXT_VERBATIM_MESSAGES
+        )
         messages = [{
             "role": "system",
             "content": "You are a DIU library assistant. Provide helpful, accurate information."
-        }] + st.session_state.chat_history[-5:] + [{"role": "user", "content": query}]
+        }] + history + [{"role": "user", "content": query}]
         
-        response = groq_client.chat.completions.create(
-            model="llama3-70b-8192",
-            messages=messages,
-            temperature=0.7
+        # Short lookups and chit-chat go to the small model, escalating on a weak answer
+        answer = complete_routed(
+            lambda model, stream: groq_completion(
+                "chat", on_text=stream,
+                model=model,
+                messages=messages,
+                temperature=0.7,
+                **({"timeout": capped_timeout("chat", timeout)} if timeout else {})
+            ),
+            classify(query, context_tokens), get_routing_stats(), on_text
         )
-        return response.choices[0].message.content
+    except CircuitOpenError:
+        return None  # the cascade falls through to the offline stage
     except Exception as e:
         return f"⚠️ Error: {str(e)}"
+    if use_cache:
+        cache.put(query, answer)
+    return answer
+
+def recommend_books(interest, skill=None):
+    """Parsed interest and the best-fitting catalog books for it, available ones first"""
+    parsed = parse_interest(interest, skill)
+    if books.empty:
+        return parsed, []
+    index = get_book_index(books_fingerprint(books), books)
+    return parsed, recommend(index, parsed, books["Available"].eq("Yes").to_numpy(),
+                             limit=RECOMMENDATION_LIMIT)
+
+def blurb_key(title, interest):
+    return f"{title} | {interest.cluster}"
+
+def request_blurb(recommendation, interest, cache):
+    """Ask Groq for a one-line pitch of a recommended book and cache it; raises on API errors"""
+    prompt = (f"In one sentence of at most 25 words, tell a student interested in "
+              f"{interest.label} why to read \"{recommendation.title}\" by "
+              f"{recommendation.author}. Reply with the sentence only.")
+    blurb = complete_routed(
+        lambda model, stream: groq_completion(
+            "recommendations",
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.3,
+            max_tokens=60
+        ),
+        CONTEXT_ROUTE, get_routing_stats()
+    ).strip().strip('"')
+    cache.put(blurb_key(recommendation.title, interest), BLURB_PROMPT_VERSION, BLURB_MODEL, blurb)
+    return blurb
+
+def book_blurbs(interest, recommendations):
+    """{title: blurb} for the top recommendations
+
+    Cached blurbs are reused across every interest in the same cluster;
+    missing ones are requested in parallel while Groq is reachable. A
+    blurb that fails or misses OVERVIEW_TIMEOUT_S is left out.
+    """
+    cache = get_blurb_cache()
+    blurbs, missing = {}, []
+    for rec in recommendations[:RECOMMENDATION_BLURBS]:
+        cached = cache.get(blurb_key(rec.title, interest), BLURB_PROMPT_VERSION, BLURB_MODEL)
+        if cached is not None:
+            blurbs[rec.title] = cached
+        else:
+            missing.append(rec)
+    if not missing or not GROQ_API_KEY or not get_circuit_breaker().allows_calls():
+        return blurbs
+
+    futures = {rec.title: get_overview_pool().submit(request_blurb, rec, interest, cache)
+               for rec in missing}
+    wait(futures.values(), timeout=OVERVIEW_TIMEOUT_S)  # late ones still fill the cache
+    for title, future in futures.items():
+        if not future.done():
+            logger.warning("Blurb for %r not ready in time", title)
+        elif future.exception() is not None:
+            logger.warning("Blurb for %r unavailable: %s", title, future.exception())
+        else:
+            blurbs[title] = future.result()
+    return blurbs
+
+def recommendations_markdown(interest, recommendations, blurbs=None):
+    """Recommended books as a markdown list, with shelf or loan status"""
+    if not recommendations:
+        genres = ", ".join(books["Genre"].value_counts().index[:6]) if not books.empty else ""
+        return (f"No books in our catalog match *{interest.text}*."
+                + (f" Try a subject such as {genres}." if genres else ""))
+    lines = [f"**📚 From our catalog for {interest.label}:**"]
+    for rec in recommendations:
+        status = f"📍 {rec.location}" if rec.available else "⏳ checked out"
+        line = f"- *{rec.title}* by {rec.author} ({rec.genre}, {rec.skill_level}) — {status}"
+        if blurbs and rec.title in blurbs:
+            line += f"  \n  {blurbs[rec.title]}"
+        lines.append(line)
+    return "\n".join(lines)
 
 def sidebar_features():
     """All sidebar components"""
@@ -358,19 +659,17 @@ def sidebar_features():
         
         # Recommendation System
         st.subheader("📚 Books Recommendations")
-        if GROQ_API_KEY:
-            interest = st.text_input("Your interests:")
-            if interest and st.button("Get Recommendations"):
-                prompt = f"Recommend academic books about {interest} with brief descriptions"
-                response = groq_client.chat.completions.create(
-                    model="llama3-70b-8192",
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.5
-                )
-                st.markdown(response.choices[0].message.content)
-        else:
-            st.markdown('<div class="warning-box">Enable Groq API for recommendations</div>', 
-                       unsafe_allow_html=True)
+        interest = st.text_input("Your interests:")
+        level = st.selectbox("Level", ("Any level",) + SKILL_LEVELS)
+        if interest and st.button("Get Recommendations"):
+            parsed, found = recommend_books(interest, level if level in SKILL_LEVELS else None)
+            # The catalog list shows at once; blurbs are filled in when they arrive
+            placeholder = st.empty()
+            placeholder.markdown(recommendations_markdown(parsed, found))
+            if found and RECOMMENDATION_BLURBS:
+                blurbs = book_blurbs(parsed, found)
+                if blurbs:
+                    placeholder.markdown(recommendations_markdown(parsed, found, blurbs))
         
         # Borrowing System
         st.subheader("🔖 Borrow Books")
@@ -388,6 +687,58 @@ def sidebar_features():
         # Session Management
         st.subheader("⚙️ Session")
         st.markdown(f"**Messages:** {len(st.session_state.chat_history)}")
+        cache_stats = get_match_cache().stats()
+        st.caption(f"Service match cache: {cache_stats['hits']} hits / "
+                   f"{cache_stats['misses']} misses")
+        explanation_stats = get_explanation_cache().stats()
+        st.caption(f"AI overview cache: {explanation_stats['hits']} hits / "
+                   f"{explanation_stats['misses']} misses")
+        if PREWARM_EXPLANATIONS and GROQ_API_KEY:
+            warmup = get_explanation_prewarmer().progress()
+            if warmup["running"]:
+                st.caption(f"Warming AI overviews: {warmup['done']}/{warmup['total']}"
+                           + (f" ({warmup['failed']} failed)" if warmup["failed"] else ""))
+        response_stats = get_response_cache(semantic_index.fingerprint).stats()
+        if response_stats["hits"] or response_stats["misses"]:
+            st.caption(f"LLM answer cache: {response_stats['hits']} hits / "
+                       f"{response_stats['misses']} misses ({response_stats['bypassed']} follow-ups)")
+        flight_stats = get_request_flights().stats()
+        if flight_stats["coalesced"]:
+            st.caption(f"Groq requests coalesced: {flight_stats['coalesced']} "
+                       f"of {flight_stats['leaders'] + flight_stats['coalesced']}")
+        breaker = get_circuit_breaker().stats()
+        if breaker["state"] != "closed":
+            st.caption(f"⚠️ AI offline ({breaker['state'].replace('_', '-')}): local answers only"
+                       + (f", retrying in {breaker['retry_in_s']:.0f} s" if breaker["retry_in_s"] else ""))
+        if managed_groq:
+            pool = managed_groq.pool_stats()
+            st.caption(f"Groq connections: {pool['connections']} open "
+                       f"({pool['idle_connections']} idle, {pool['queued_requests']} queued)")
+            limits = managed_groq.limiter.stats()
+            if limits["queued"] or limits["paused_s"]:
+                st.caption(f"Groq rate limit: {limits['queued']} waiting, "
+                           f"{limits['requests_left']} requests / {limits['tokens_left']} tokens left")
+        routing = get_routing_stats().snapshot()
+        if routing["routes"]:
+            escalated = sum(routing["escalations"].values())
+            st.caption("Models: " + ", ".join(
+                f"{name} {r['routed']} (p50 {r['latency_ms_p50']:.0f} ms)"
+                for name, r in routing["routes"].items()
+            ) + (f", {escalated} escalated" if escalated else ""))
+        if HEDGE_REQUESTS:
+            hedges = get_hedger().stats()
+            if hedges["hedged"] or hedges["capped"]:
+                st.caption(f"Hedged requests: {hedges['hedged']} of {hedges['calls']} "
+                           f"({hedges['hedge_wins']} won, {hedges['capped']} capped)")
+        answered = {name: c["answered"] for name, c in get_cascade_stats().snapshot().items()
+                    if c["answered"]}
+        if answered:
+            st.caption("Answered by: " + ", ".join(f"{n} {c}" for n, c in answered.items()))
+        for label, c in get_completion_stats().snapshot().items():
+            if c["calls"] == c["errors"]:
+                continue
+            st.caption(f"LLM {label}: first token p50 {c['ttft_ms_p50']:.0f} ms, "
+                       f"total p50 {c['total_ms_p50']:.0f} ms ({c['calls']} calls)")
         if st.button("🧹 Clear History"):
             st.session_state.chat_history = []
             st.rerun()
@@ -396,6 +747,8 @@ def sidebar_features():
 # Main Application
 # ----------------------------- #
 def main():
+    if PREWARM_EXPLANATIONS and GROQ_API_KEY:
+        get_explanation_prewarmer()  # returns at once; warming continues in the background
     load_css()
     chat_interface()
     sidebar_features()
@@ -0,0 +1,135 @@
+import numpy as np
+from dataclasses import dataclass
+from fuzzywuzzy import fuzz
+from service_matching import candidate_positions, normalize_term, query_cache_key, trigrams
+
+CHUNK_SIZE = 4096  # queries scored per matrix product
+PARTIAL_WEIGHT = 0.9  # same discount WRatio applies to partial matches
+
+# ----------------------------- #
+# Batch Matching (offline only, never calls Groq)
+# ----------------------------- #
+@dataclass(frozen=True)
+class BatchMatrices:
+    """Dense trigram features of an index, precomputed for vectorized scoring"""
+    services: tuple           # column labels of every score matrix
+    gram_ids: dict            # trigram -> column in term_grams
+    term_grams: np.ndarray    # (terms x trigrams) 0/1 matrix
+    term_sizes: np.ndarray    # distinct trigrams per term
+    service_terms: tuple      # term positions belonging to each service
+
+
+@dataclass(frozen=True)
+class BatchResult:
+    """Scores of many queries against every service"""
+    services: tuple
+    scores: np.ndarray        # (queries x services), 0-100
+    top_services: np.ndarray  # (queries x k) column indices, best first
+    top_scores: np.ndarray    # (queries x k)
+
+    def top_matches(self, row):
+        """[(service, score), ...] for one query, best first"""
+        return [(self.services[col], float(score))
+                for col, score in zip(self.top_services[row], self.top_scores[row])]
+
+
+_matrices_cache = {}
+
+def batch_matrices(index):
+    """Return the BatchMatrices for a ServiceIndex, built once per fingerprint"""
+    matrices = _matrices_cache.get(index.fingerprint)
+    if matrices is not None:
+        return matrices
+
+    gram_ids = {gram: col for col, gram in enumerate(sorted(index.trigram_postings))}
+    term_grams = np.zeros((len(index.terms), len(gram_ids)), dtype=np.float32)
+    for gram, positions in index.trigram_postings.items():
+        term_grams[list(positions), gram_ids[gram]] = 1.0
+
+    services = tuple(index.service_names)
+    members = {service: [] for service in services}
+    for pos, processed in enumerate(index.processed_terms):
+        for service in index.term_to_services[processed]:
+            members[service].append(pos)
+
+    matrices = BatchMatrices(
+        services=services,
+        gram_ids=gram_ids,
+        term_grams=term_grams,
+        term_sizes=np.asarray(index.term_trigram_counts, dtype=np.float32),
+        service_terms=tuple(np.asarray(members[s]) for s in services)
+    )
+    _matrices_cache.clear()
+    _matrices_cache[index.fingerprint] = matrices
+    return matrices
+
+
+def _query_features(matrices, processed_queries):
+    """Query x trigram matrix plus each query's total trigram count"""
+    features = np.zeros((len(processed_queries), len(matrices.gram_ids)), dtype=np.float32)
+    sizes = np.zeros(len(processed_queries), dtype=np.float32)
+    for row, processed in enumerate(processed_queries):
+        grams = trigrams(processed)
+        sizes[row] = len(grams)
+        cols = [matrices.gram_ids[g] for g in grams if g in matrices.gram_ids]
+        features[row, cols] = 1.0
+    return features, sizes
+
+
+def _trigram_term_scores(matrices, processed_queries):
+    """Vectorized trigram analogue of WRatio: max(Dice, 0.9 x overlap coefficient)"""
+    features, query_sizes = _query_features(matrices, processed_queries)
+    shared = features @ matrices.term_grams.T
+    q_sizes = query_sizes[:, None]
+    t_sizes = matrices.term_sizes[None, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dice = np.nan_to_num(2 * shared / (q_sizes + t_sizes))
+        overlap = np.nan_to_num(shared / np.minimum(q_sizes, t_sizes))
+    return 100 * np.maximum(dice, PARTIAL_WEIGHT * overlap)
+
+
+def _fuzzy_term_scores(index, processed_queries):
+    """Production WRatio scores over the trigram-pruned candidates; 0 elsewhere"""
+    scores = np.zeros((len(processed_queries), len(index.terms)), dtype=np.float32)
+    for row, processed in enumerate(processed_queries):
+        for pos in candidate_positions(index, processed):
+            scores[row, pos] = fuzz.WRatio(processed, index.processed_terms[pos], full_process=False)
+    return scores
+
+
+def score_queries(index, queries, k=3, method="trigram"):
+    """Score queries against every service and return a BatchResult
+
+    Queries are normalized with query_cache_key, as the live cascade does.
+    method="trigram" is fully vectorized and suited to large query logs.
+    method="fuzzy" runs the live fuzzy stage's WRatio over the same
+    trigram-pruned candidates, so its top match is the live one whenever
+    that scores at least the live cutoff plus PRUNE_RESCAN_MARGIN (below
+    it the live stage rescans every term); it runs WRatio per candidate,
+    so it is much slower.
+    """
+    if method not in ("trigram", "fuzzy"):
+        raise ValueError(f"Unknown batch scoring method: {method}")
+
+    matrices = batch_matrices(index)
+    processed = [normalize_term(query_cache_key(q)) for q in queries]
+    scores = np.zeros((len(processed), len(matrices.services)), dtype=np.float32)
+
+    for start in range(0, len(processed), CHUNK_SIZE):
+        chunk = processed[start:start + CHUNK_SIZE]
+        if method == "trigram":
+            term_scores = _trigram_term_scores(matrices, chunk)
+        else:
+            term_scores = _fuzzy_term_scores(index, chunk)
+        # A service scores as well as its best-matching name or keyword
+        for col, positions in enumerate(matrices.service_terms):
+            scores[start:start + len(chunk), col] = term_scores[:, positions].max(axis=1)
+
+    k = min(k, len(matrices.services))
+    top_services = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    return BatchResult(
+        services=matrices.services,
+        scores=scores,
+        top_services=top_services,
+        top_scores=np.take_along_axis(scores, top_services, axis=1)
+    )
@@ -0,0 +1,75 @@
+"""Hit accuracy of the LLM response cache on labeled question pairs
+
+For each pair in response_cache_pairs.csv the first question is cached and
+the second looked up, at a range of similarity thresholds. Paraphrases
+(same=1) should hit; near misses (same=0), such as questions differing
+only in a number, must not, since a hit returns the other question's
+answer.
+
+    python benchmarks/bench_response_cache.py
+    python benchmarks/bench_response_cache.py --thresholds 0.7 0.8 0.9
+"""
+import argparse
+import csv
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAIRS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "response_cache_pairs.csv")
+
+
+def load_pairs(path):
+    """[(cached question, asked question, same answer?)]"""
+    with open(path, newline="", encoding="utf-8") as f:
+        return [(row["cached"], row["asked"], row["same"] == "1") for row in csv.DictReader(f)]
+
+
+def evaluate(bucket_weights, pairs, threshold):
+    """(paraphrases hit, near misses hit, [wrongly handled pairs])"""
+    from response_cache import SemanticResponseCache
+    hits = wrong_hits = 0
+    wrong = []
+    for cached, asked, same in pairs:
+        cache = SemanticResponseCache(bucket_weights, maxsize=4, threshold=threshold)
+        cache.put(cached, "answer")
+        hit = cache.get(asked) is not None
+        hits += hit and same
+        wrong_hits += hit and not same
+        if hit != same:
+            wrong.append((cached, asked, "wrong hit" if hit else "miss"))
+    return hits, wrong_hits, wrong
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pairs", default=PAIRS, help="labeled pair CSV")
+    parser.add_argument("--thresholds", nargs="+", type=float,
+                        default=[0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9])
+    parser.add_argument("--show", type=float, default=None,
+                        help="list the pairs handled wrongly at this threshold")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from service_catalog import load_service_catalog
+    bucket_weights = load_service_catalog(
+        os.path.join(ROOT, "library_services.json")).semantic_index.bucket_weights
+    pairs = load_pairs(args.pairs)
+    paraphrases = sum(same for _, _, same in pairs)
+    near_misses = len(pairs) - paraphrases
+    print(f"{paraphrases} paraphrase pairs, {near_misses} near-miss pairs\n")
+
+    header = f"{'threshold':>10}{'paraphrase hits':>18}{'wrong hits':>12}"
+    print(header)
+    print("-" * len(header))
+    for threshold in args.thresholds:
+        hits, wrong_hits, _ = evaluate(bucket_weights, pairs, threshold)
+        print(f"{threshold:>10.2f}{hits / paraphrases:>18.1%}{wrong_hits / near_misses:>12.1%}")
+
+    if args.show is not None:
+        print(f"\nwrongly handled at {args.show}:")
+        for cached, asked, outcome in evaluate(bucket_weights, pairs, args.show)[2]:
+            print(f"  {outcome:<10} {cached!r} / {asked!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Latency and accuracy benchmark for LibraAI service matching
+
+Runs every query in service_queries.csv through the query cascade for each
+matcher configuration and reports p50/p95/p99 latency, throughput, top-1 and
+top-3 accuracy and the false-fallback rate. The Groq client is replaced by a
+stub, so the benchmark runs offline and never spends API quota.
+
+    python benchmarks/bench_service_matching.py
+    python benchmarks/bench_service_matching.py --configs fuzzy exact+fuzzy+bm25 --rounds 10
+    python benchmarks/bench_service_matching.py --configs fuzzy --verify-pruning
+"""
+import argparse
+import csv
+import logging
+import os
+import sys
+import time
+import warnings
+from collections import defaultdict
+from types import SimpleNamespace
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "service_queries.csv")
+
+DEFAULT_CONFIGS = [
+    "legacy",  # exhaustive fuzzywuzzy scan of the raw query, as before the cascade
+    "fuzzy",
+    "exact+fuzzy",
+    "exact+fuzzy+bm25",
+    "exact+fuzzy+bm25+semantic",
+    "exact+phonetic+fuzzy+bm25+semantic",
+    "exact+phonetic+bm25+semantic+fuzzy",  # the live cascade
+    "bm25",
+    "semantic",
+    "phonetic",
+]
+
+# ----------------------------- #
+# Offline Groq Stand-in
+# ----------------------------- #
+class StubGroq:
+    """Minimal stand-in for groq.Groq that answers instantly and counts calls"""
+
+    def __init__(self):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        self.calls += 1
+        message = SimpleNamespace(content="(stubbed LLM answer)")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def load_app(stub):
+    """Import app.py with the Groq client stubbed out (kept as configured when stub is None)"""
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    if stub is not None:
+        os.environ["GROQ_API_KEY"] = "benchmark-stub"
+    warnings.filterwarnings("ignore")
+    import streamlit  # configures its loggers on import; quieten bare-mode warnings after
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit"):
+            logging.getLogger(name).setLevel(logging.ERROR)
+    logging.getLogger("cascade").setLevel(logging.ERROR)
+    import app
+    if stub is not None:
+        app.managed_groq = None  # groq_for() then hands out the stub for every profile
+        app.groq_client = stub
+    return app
+
+
+def load_corpus(path):
+    """[(query, {expected services}, category)]; an empty set means out of scope"""
+    with open(path, newline="", encoding="utf-8") as f:
+        return [
+            (row["query"], {s for s in row["expected"].split("|") if s}, row["category"])
+            for row in csv.DictReader(f)
+        ]
+
+# ----------------------------- #
+# Benchmark
+# ----------------------------- #
+def config_stages(app, config, stub):
+    """Cascade stages for a configuration, ending in the stubbed LLM"""
+    if config == "legacy":
+        threshold = app.CASCADE_CONFIG["fuzzy"]["threshold"]
+        from service_matching import match_service
+        stages = [app.Stage("fuzzy", lambda q: match_service(
+            app.service_index, q, score_cutoff=threshold, prune=False), float("inf"))]
+    else:
+        stages = app.cascade_stages(include_llm=False, names=config)
+
+    def stub_llm(query):
+        response = stub.chat.completions.create(messages=[{"role": "user", "content": query}])
+        return response.choices[0].message.content
+
+    return stages + [app.Stage("llm", stub_llm, float("inf"), required=True)]
+
+
+def run_config(app, config, corpus, rounds, stub):
+    """Latency samples and first-round outcomes for one configuration"""
+    stages = config_stages(app, config, stub)
+    latencies, outcomes = [], []
+    for round_no in range(rounds):
+        app.get_match_cache().invalidate()  # measure the uncached path every round
+        for query, expected, category in corpus:
+            start = time.perf_counter()
+            result = app.run_cascade(stages, query)
+            latencies.append(time.perf_counter() - start)
+            if round_no == 0:
+                services = () if result.stage == "llm" else result.answer.services
+                outcomes.append((expected, category, services))
+    return np.asarray(latencies), outcomes
+
+
+def summarize(latencies, outcomes):
+    """Metrics row for one configuration"""
+    in_scope = [(e, s) for e, _, s in outcomes if e]
+    out_of_scope = [s for e, _, s in outcomes if not e]
+    top1 = sum(1 for e, s in in_scope if s and s[0] in e)
+    top3 = sum(1 for e, s in in_scope if e & set(s[:3]))
+    fallbacks = sum(1 for _, s in in_scope if not s)
+    false_matches = sum(1 for s in out_of_scope if s)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p99,
+        "qps": len(latencies) / latencies.sum(),
+        "top1": top1 / len(in_scope) if in_scope else 0.0,
+        "top3": top3 / len(in_scope) if in_scope else 0.0,
+        "false_fallback": fallbacks / len(in_scope) if in_scope else 0.0,
+        "false_match": false_matches / len(out_of_scope) if out_of_scope else 0.0,
+    }
+
+
+def category_accuracy(outcomes):
+    """Top-1 accuracy per corpus category (out-of-scope: correct fallback rate)"""
+    totals, correct = defaultdict(int), defaultdict(int)
+    for expected, category, services in outcomes:
+        totals[category] += 1
+        if expected:
+            correct[category] += bool(services) and services[0] in expected
+        else:
+            correct[category] += not services
+    return {c: correct[c] / totals[c] for c in totals}
+
+
+def verify_pruning(app, corpus):
+    """pruning_stats after matching every query with verify=True at the live fuzzy cutoff"""
+    from service_matching import match_service, pruning_stats, query_cache_key
+    pruning_stats.clear()
+    cutoff = app.CASCADE_CONFIG["fuzzy"]["threshold"]
+    for query, _, _ in corpus:
+        match_service(app.service_index, query_cache_key(query), score_cutoff=cutoff, verify=True)
+    return dict(pruning_stats)
+
+
+def print_table(rows):
+    header = (f"{'configuration':<38}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'q/s':>10}"
+              f"{'top-1':>8}{'top-3':>8}{'false fb':>10}{'false hit':>10}")
+    print(header)
+    print("-" * len(header))
+    for config, m in rows:
+        print(f"{config:<38}{m['p50_ms']:>9.3f}{m['p95_ms']:>9.3f}{m['p99_ms']:>9.3f}"
+              f"{m['qps']:>10.0f}{m['top1']:>8.1%}{m['top3']:>8.1%}"
+              f"{m['false_fallback']:>10.1%}{m['false_match']:>10.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--configs", nargs="+", default=DEFAULT_CONFIGS,
+                        help="'legacy' or '+'-joined local cascade stages")
+    parser.add_argument("--rounds", type=int, default=5, help="passes over the corpus per config")
+    parser.add_argument("--corpus", default=CORPUS, help="labeled query CSV")
+    parser.add_argument("--by-category", action="store_true",
+                        help="also print top-1 accuracy per query category")
+    parser.add_argument("--verify-pruning", action="store_true",
+                        help="also compare trigram-pruned fuzzy matches with the exhaustive scan")
+    args = parser.parse_args()
+
+    stub = StubGroq()
+    app = load_app(stub)
+    corpus = load_corpus(args.corpus)
+    print(f"{len(corpus)} queries x {args.rounds} rounds, Groq stubbed\n")
+
+    rows, categories = [], []
+    for config in args.configs:
+        latencies, outcomes = run_config(app, config, corpus, args.rounds, stub)
+        rows.append((config, summarize(latencies, outcomes)))
+        categories.append((config, category_accuracy(outcomes)))
+    print_table(rows)
+
+    if args.by_category:
+        names = sorted({c for _, acc in categories for c in acc})
+        print(f"\n{'configuration':<38}" + "".join(f"{n:>14}" for n in names))
+        for config, acc in categories:
+            print(f"{config:<38}" + "".join(f"{acc.get(n, 0):>14.1%}" for n in names))
+    if args.verify_pruning:
+        stats = verify_pruning(app, corpus)
+        print(f"\ntrigram pruning: {stats.get('mismatches', 0)} of {stats['verified']} top matches "
+              f"differ from the exhaustive scan, {stats.get('rescanned', 0)} rescanned")
+    print(f"\nstubbed Groq calls: {stub.calls}")
+
+
+if __name__ == "__main__":
+    main()
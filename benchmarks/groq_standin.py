@@ -0,0 +1,418 @@
+"""Local stand-in for the Groq chat completions API, for offline load tests
+
+Serves POST /openai/v1/chat/completions like Groq does, streamed (SSE) or
+not, so the real client stack (pooling, rate limiting, retries, breaker,
+hedging) runs unchanged against it. Answers are replayed from a recordings
+file when the request was recorded, and synthesized otherwise. Latency,
+rate limits (429 with x-ratelimit-* headers), server errors and hanging
+requests are configurable. GET /stats reports what was served.
+
+    python benchmarks/groq_standin.py --port 8787 --ttft lognormal:400,0.6 --requests-per-min 60
+    GROQ_BASE_URL=http://127.0.0.1:8787 GROQ_API_KEY=standin streamlit run app.py
+
+Recording real answers needs network access and a real GROQ_API_KEY in the
+stand-in's environment; every request is forwarded to Groq and saved:
+
+    python benchmarks/groq_standin.py --record --recordings benchmarks/groq_recordings.jsonl
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from chat_context import count_tokens  # noqa: E402
+from rate_limit import TokenBucket  # noqa: E402
+from streaming import estimate_tokens  # noqa: E402
+
+COMPLETIONS_PATH = "/openai/v1/chat/completions"
+
+FILLER = (
+    "The library can help with this through its catalog, reference desk and online "
+    "resources. Students usually start with the catalog search, then ask a librarian "
+    "for specialised databases, interlibrary loans or reading lists. Opening hours, "
+    "borrowing limits and renewal rules are listed on the library website, and most "
+    "requests can be made with a DIU account from any campus computer."
+).split()
+
+# ----------------------------- #
+# Latency Distributions
+# ----------------------------- #
+def parse_latency(spec):
+    """Sampler of milliseconds for "fixed:MS", "uniform:LO,HI" or "lognormal:MEDIAN,SIGMA" """
+    kind, _, params = spec.partition(":")
+    try:
+        values = [float(v) for v in params.split(",")] if params else []
+        if kind == "fixed" and len(values) == 1:
+            return lambda rng: values[0]
+        if kind == "uniform" and len(values) == 2:
+            return lambda rng: rng.uniform(*values)
+        if kind == "lognormal" and len(values) == 2:
+            median, sigma = values
+            return lambda rng: median * rng.lognormvariate(0, sigma)
+    except ValueError:
+        pass
+    raise ValueError(f"bad latency spec {spec!r}; "
+                     "use fixed:MS, uniform:LO,HI or lognormal:MEDIAN,SIGMA")
+
+
+def format_duration(seconds):
+    """Seconds in Groq's reset-header style ("2m59.56s", "7.66s")"""
+    minutes, seconds = divmod(max(seconds, 0.0), 60)
+    return f"{int(minutes)}m{seconds:.2f}s" if minutes else f"{seconds:.2f}s"
+
+# ----------------------------- #
+# Recorded & Synthetic Answers
+# ----------------------------- #
+def recording_key(model, messages):
+    """Replay key of a request: its model and messages"""
+    payload = json.dumps({"model": model, "messages": messages}, sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def load_recordings(path):
+    """{key: content} from a JSONL recordings file; empty when it does not exist"""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return {row["key"]: row["content"] for row in rows}
+
+
+def synthesize(messages, words, rng):
+    """Plausible answer of about words words to the last user message"""
+    question = next((m.get("content") or "" for m in reversed(messages)
+                     if m.get("role") == "user"), "")
+    topic = " ".join(question.split()[:12]).rstrip("?.!")
+    text = [f"About {topic}:" if topic else "Here is what the library suggests:"]
+    start = rng.randrange(len(FILLER))
+    text.extend(FILLER[(start + i) % len(FILLER)] for i in range(max(words, 8)))
+    return " ".join(text).rstrip(",") + "."
+
+
+def split_tokens(text):
+    """Text cut into token-sized pieces (words with their trailing space)"""
+    return re.findall(r"\S+\s*|\s+", text)
+
+# ----------------------------- #
+# Stand-in Server
+# ----------------------------- #
+@dataclass
+class StandinConfig:
+    ttft: str = "lognormal:350,0.5"       # time to first token
+    tokens_per_s: float = 250.0           # streaming speed after the first token
+    answer_words: int = 80                # length of synthesized answers
+    requests_per_min: float = 0           # 0: no rate limit
+    tokens_per_min: float = 0
+    error_rate: float = 0.0               # share of requests failing with a 503
+    timeout_rate: float = 0.0             # share of requests that hang
+    hang_s: float = 60.0                  # how long a hanging request stalls
+    recordings: str = None                # JSONL file to replay (and record into)
+    record: bool = False                  # forward to Groq and save the answers
+    seed: int = None
+
+
+class GroqStandin:
+    """Threaded HTTP server answering Groq chat completion requests"""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or StandinConfig()
+        self.ttft_ms = parse_latency(self.config.ttft)
+        self.recordings = load_recordings(self.config.recordings)
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._stats = Counter()
+        self._stopping = threading.Event()
+        self._ids = iter(range(1, 1 << 62))
+        self._buckets = {
+            kind: TokenBucket(limit, limit / 60)
+            for kind, limit in (("requests", self.config.requests_per_min),
+                                ("tokens", self.config.tokens_per_min)) if limit
+        }
+        self._upstream = None
+        if self.config.record:
+            from groq import Groq
+            self._upstream = Groq(api_key=os.environ["GROQ_API_KEY"])
+        self.server = _Server((host, port), _Handler)
+        self.server.standin = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve from a background thread; returns self"""
+        self._thread = threading.Thread(target=self.server.serve_forever,
+                                        name="groq-standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopping.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._stats[name] += n
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def sample(self, draw):
+        with self._lock:
+            return draw(self._rng)
+
+    def next_id(self):
+        with self._lock:
+            return next(self._ids)
+
+    def sleep(self, seconds):
+        """Sleep unless the server is shutting down; False when it is"""
+        return not self._stopping.wait(seconds)
+
+    def admit(self, tokens):
+        """Rate-limit headers for a request, and the retry-after when it is refused"""
+        with self._lock:
+            now = time.monotonic()
+            for bucket in self._buckets.values():
+                bucket.refill(now)
+            needed = {"requests": 1, "tokens": tokens}
+            retry_after = max((b.seconds_until(needed[k]) for k, b in self._buckets.items()),
+                              default=0.0)
+            if retry_after == 0:
+                for kind, bucket in self._buckets.items():
+                    bucket.level -= min(needed[kind], bucket.capacity)
+            headers = {}
+            for kind, bucket in self._buckets.items():
+                headers[f"x-ratelimit-limit-{kind}"] = str(int(bucket.capacity))
+                headers[f"x-ratelimit-remaining-{kind}"] = str(max(int(bucket.level), 0))
+                headers[f"x-ratelimit-reset-{kind}"] = format_duration(
+                    (bucket.capacity - bucket.level) / bucket.rate)
+        return headers, retry_after
+
+    def answer(self, request):
+        """Content for a request: recorded, forwarded to Groq, or synthesized"""
+        model, messages = request.get("model"), request.get("messages") or []
+        key = recording_key(model, messages)
+        content = self.recordings.get(key)
+        if content is not None:
+            self.count("replayed")
+            return content
+        if self._upstream is not None:
+            response = self._upstream.chat.completions.create(
+                **{k: v for k, v in request.items() if k != "stream"})
+            content = response.choices[0].message.content
+            with self._lock:
+                self.recordings[key] = content
+                if self.config.recordings:
+                    with open(self.config.recordings, "a", encoding="utf-8") as f:
+                        f.write(json.dumps({"key": key, "model": model, "messages": messages,
+                                            "content": content}) + "\n")
+            self.count("recorded")
+            return content
+        self.count("synthesized")
+        return self.sample(lambda rng: synthesize(messages, self.config.answer_words, rng))
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+        # clients dropping kept-alive or cancelled connections are routine here
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so the client's pooling is exercised
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._json(200, self.server.standin.stats())
+        else:
+            self._json(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        standin = self.server.standin
+        body = self.rfile.read(int(self.headers.get("content-length") or 0))
+        if self.path.rstrip("/") != COMPLETIONS_PATH:
+            self._json(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+            return
+        try:
+            request = json.loads(body)
+        except ValueError:
+            self._json(400, {"error": {"message": "invalid JSON", "type": "invalid_request_error"}})
+            return
+        standin.count("requests")
+
+        headers, retry_after = standin.admit(estimate_tokens(**request))
+        if retry_after:
+            standin.count("status_429")
+            headers["retry-after"] = f"{retry_after:.2f}"
+            self._json(429, {"error": {"message": "Rate limit reached; please try again in "
+                                       f"{format_duration(retry_after)}",
+                                       "type": "tokens", "code": "rate_limit_exceeded"}},
+                       headers)
+            return
+        roll = standin.sample(lambda rng: rng.random())
+        if roll < standin.config.error_rate:
+            standin.count("status_503")
+            self._json(503, {"error": {"message": "Service Unavailable",
+                                       "type": "internal_server_error"}}, headers)
+            return
+        if roll < standin.config.error_rate + standin.config.timeout_rate:
+            standin.count("hung")
+            standin.sleep(standin.config.hang_s)
+            self.close_connection = True
+            return
+
+        try:
+            content = standin.answer(request)
+        except Exception as e:
+            standin.count("status_502")
+            self._json(502, {"error": {"message": f"upstream error: {e}",
+                                       "type": "internal_server_error"}}, headers)
+            return
+        if not standin.sleep(standin.sample(standin.ttft_ms) / 1000):
+            return
+        standin.count("status_200")
+        completion_id = f"chatcmpl-standin-{standin.next_id()}"
+        usage = {"prompt_tokens": sum(count_tokens(m.get("content") or "") + 4
+                                      for m in request.get("messages") or ()),
+                 "completion_tokens": count_tokens(content)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        try:
+            if request.get("stream"):
+                standin.count("streamed")
+                self._stream(completion_id, request.get("model"), content, usage, headers)
+            else:
+                self._json(200, {
+                    "id": completion_id, "object": "chat.completion",
+                    "created": int(time.time()), "model": request.get("model"),
+                    "choices": [{"index": 0, "finish_reason": "stop", "logprobs": None,
+                                 "message": {"role": "assistant", "content": content}}],
+                    "usage": usage, "x_groq": {"id": completion_id},
+                }, headers)
+        except (BrokenPipeError, ConnectionResetError):
+            standin.count("client_disconnects")  # e.g. a cancelled hedge or a client timeout
+
+    def _json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, completion_id, model, content, usage, headers):
+        standin = self.server.standin
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("transfer-encoding", "chunked")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        def event(data):
+            payload = f"data: {data}\n\n".encode()
+            self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+            self.wfile.flush()
+
+        def chunk(delta, finish_reason=None, **extra):
+            return json.dumps({
+                "id": completion_id, "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": delta, "logprobs": None,
+                             "finish_reason": finish_reason}],
+                "x_groq": {"id": completion_id, **extra},
+            })
+
+        event(chunk({"role": "assistant", "content": ""}))
+        interval_s = 1 / standin.config.tokens_per_s if standin.config.tokens_per_s else 0
+        for i, piece in enumerate(split_tokens(content)):
+            if i and not standin.sleep(interval_s):
+                return
+            event(chunk({"content": piece}))
+        event(chunk({}, "stop", usage=usage))
+        event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+# ----------------------------- #
+# Command Line
+# ----------------------------- #
+def add_arguments(parser):
+    """Stand-in behaviour options, shared with the LLM load test"""
+    defaults = StandinConfig()
+    parser.add_argument("--ttft", default=defaults.ttft,
+                        help="time to first token: fixed:MS, uniform:LO,HI or lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--tokens-per-s", type=float, default=defaults.tokens_per_s,
+                        help="streaming speed after the first token")
+    parser.add_argument("--answer-words", type=int, default=defaults.answer_words,
+                        help="length of synthesized answers")
+    parser.add_argument("--requests-per-min", type=float, default=defaults.requests_per_min,
+                        help="server-side request limit (0: none); excess gets 429s")
+    parser.add_argument("--tokens-per-min", type=float, default=defaults.tokens_per_min,
+                        help="server-side token limit (0: none)")
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate,
+                        help="share of requests answered with a 503")
+    parser.add_argument("--timeout-rate", type=float, default=defaults.timeout_rate,
+                        help="share of requests that hang for --hang-s")
+    parser.add_argument("--hang-s", type=float, default=defaults.hang_s)
+    parser.add_argument("--recordings", help="JSONL file of recorded answers to replay")
+    parser.add_argument("--record", action="store_true",
+                        help="forward unrecorded requests to Groq and append them to --recordings")
+    parser.add_argument("--seed", type=int, help="random seed for latencies and failures")
+
+
+def config_from_args(args):
+    return StandinConfig(
+        ttft=args.ttft, tokens_per_s=args.tokens_per_s, answer_words=args.answer_words,
+        requests_per_min=args.requests_per_min, tokens_per_min=args.tokens_per_min,
+        error_rate=args.error_rate, timeout_rate=args.timeout_rate, hang_s=args.hang_s,
+        recordings=args.recordings, record=args.record, seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    add_arguments(parser)
+    args = parser.parse_args()
+    if args.record and not args.recordings:
+        parser.error("--record needs --recordings")
+
+    standin = GroqStandin(config_from_args(args), args.host, args.port)
+    print(f"Groq stand-in on {standin.url} ({len(standin.recordings)} recorded answers); "
+          f"set GROQ_BASE_URL={standin.url}")
+    try:
+        standin.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        standin.server.server_close()
+        print(json.dumps(standin.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Load test of app.py's LLM paths against the local Groq stand-in
+
+Starts benchmarks/groq_standin.py in-process, points app.py's Groq client
+at it and runs concurrent virtual users through the chat fallback, AI
+service explanations and book recommendations. Reports latency and
+outcomes per path together with the app's rate limiter, circuit breaker,
+coalescing and hedging counters. No network access or Groq quota needed.
+
+    python benchmarks/load_test_llm.py --users 20 --requests 300
+    python benchmarks/load_test_llm.py --users 40 --requests-per-min 120 --error-rate 0.05 --hedge
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from bench_service_matching import CORPUS, load_app
+from groq_standin import GroqStandin, add_arguments, config_from_args
+
+GENERAL_QUERIES = [
+    "what is the history of daffodil international university",
+    "how do I write a literature review",
+    "explain the difference between primary and secondary sources",
+    "suggest a study plan for final exams",
+    "what is machine learning",
+    "how to cite a website in APA style",
+    "tips for writing a thesis abstract",
+    "what are open access journals",
+]
+INTERESTS = ["machine learning", "python programming", "data science", "philosophy",
+             "research methods", "business management", "statistics", "web development"]
+
+
+def chat_queries(path=CORPUS):
+    """Out-of-scope corpus queries (the ones that reach the LLM) plus general questions"""
+    with open(path, newline="", encoding="utf-8") as f:
+        fallbacks = [row["query"] for row in csv.DictReader(f) if not row["expected"]]
+    return fallbacks + GENERAL_QUERIES
+
+# ----------------------------- #
+# Virtual Users
+# ----------------------------- #
+class LoadTest:
+    """Virtual users sharing a request quota, recording latency per path"""
+
+    def __init__(self, app, mix, total, think_ms, stream, seed=None):
+        self.app = app
+        self.paths = list(mix)
+        self.weights = [mix[p] for p in self.paths]
+        self.remaining = total
+        self.think_ms = think_ms
+        self.stream = stream
+        self.queries = chat_queries()
+        self.services = list(app.library_services)
+        self._seed = seed
+        self._lock = threading.Lock()
+        self.latency_ms = defaultdict(list)
+        self.ttft_ms = defaultdict(list)
+        self.outcomes = defaultdict(Counter)
+
+    def _take(self):
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+    def _call(self, path, rng, on_text):
+        """Outcome of one request: "ok", "error" or "offline" (answered locally)"""
+        app = self.app
+        if path == "chat":
+            answer = app.generate_groq_response(rng.choice(self.queries), on_text=on_text)
+            return "offline" if answer is None else "error" if answer.startswith("⚠️") else "ok"
+        if path == "explanation":
+            app.request_ai_explanation(rng.choice(self.services), app.get_explanation_cache(),
+                                       on_text)
+            return "ok"
+        # Ranked locally; only the blurbs for the top books reach the LLM
+        interest, found = app.recommend_books(rng.choice(INTERESTS))
+        blurbs = app.book_blurbs(interest, found)
+        return "ok" if len(blurbs) == min(len(found), app.RECOMMENDATION_BLURBS) else "error"
+
+    def user(self, user_no):
+        rng = random.Random(None if self._seed is None else self._seed + user_no)
+        while self._take():
+            path = rng.choices(self.paths, self.weights)[0]
+            first = []
+            on_text = (lambda text: first or first.append(time.perf_counter())) \
+                if self.stream else None
+            start = time.perf_counter()
+            try:
+                outcome = self._call(path, rng, on_text)
+            except Exception as e:
+                outcome = f"error: {type(e).__name__}"
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self.outcomes[path][outcome] += 1
+                self.latency_ms[path].append(elapsed_ms)
+                if first:
+                    self.ttft_ms[path].append((first[0] - start) * 1000)
+            if self.think_ms:
+                time.sleep(rng.expovariate(1000 / self.think_ms))
+
+    def run(self, users):
+        threads = [threading.Thread(target=self.user, args=(n,), name=f"user-{n}")
+                   for n in range(users)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return time.perf_counter() - start
+
+
+def print_report(test, elapsed_s):
+    header = (f"{'path':<16}{'calls':>7}{'ok':>7}{'errors':>8}{'offline':>9}"
+              f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'ttft p50':>10}")
+    print(header)
+    print("-" * len(header))
+    for path in test.paths:
+        samples = test.latency_ms[path]
+        if not samples:
+            continue
+        outcomes = test.outcomes[path]
+        errors = sum(n for outcome, n in outcomes.items() if outcome.startswith("error"))
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        ttft = np.percentile(test.ttft_ms[path], 50) if test.ttft_ms[path] else float("nan")
+        print(f"{path:<16}{len(samples):>7}{outcomes['ok']:>7}{errors:>8}{outcomes['offline']:>9}"
+              f"{p50:>9.0f}{p95:>9.0f}{p99:>9.0f}{ttft:>10.0f}")
+    total = sum(len(s) for s in test.latency_ms.values())
+    print(f"\n{total} requests in {elapsed_s:.1f} s ({total / elapsed_s:.1f} req/s)")
+    errors = Counter()
+    for outcomes in test.outcomes.values():
+        errors.update({o: n for o, n in outcomes.items() if o.startswith("error: ")})
+    if errors:
+        print("exceptions: " + ", ".join(f"{o[7:]} x{n}" for o, n in errors.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--requests", type=int, default=200, help="total requests across users")
+    parser.add_argument("--mix", default="chat=0.6,explanation=0.25,recommendations=0.15",
+                        help="share of requests per LLM path")
+    parser.add_argument("--think-ms", type=float, default=0,
+                        help="mean pause between a user's requests")
+    parser.add_argument("--no-stream", action="store_true", help="blocking calls only")
+    parser.add_argument("--hedge", action="store_true", help="enable request hedging in the app")
+    parser.add_argument("--client-requests-per-min", type=float, default=None,
+                        help="app-side GROQ_REQUESTS_PER_MIN (default: the app's)")
+    parser.add_argument("--client-tokens-per-min", type=float, default=None,
+                        help="app-side GROQ_TOKENS_PER_MIN (default: the app's)")
+    add_arguments(parser)
+    args = parser.parse_args()
+    mix = {p: float(w) for p, _, w in (part.partition("=") for part in args.mix.split(","))}
+    unknown = set(mix) - {"chat", "explanation", "recommendations"}
+    if unknown:
+        parser.error(f"unknown paths in --mix: {', '.join(sorted(unknown))}")
+
+    standin = GroqStandin(config_from_args(args)).start()
+    cache_dir = tempfile.mkdtemp()
+    # Everything the app reads at import; the stand-in ignores the API key
+    os.environ.update(GROQ_BASE_URL=standin.url, GROQ_API_KEY="load-test-standin",
+                      PREWARM_EXPLANATIONS="0", HEDGE_REQUESTS="1" if args.hedge else "0",
+                      EXPLANATION_CACHE_PATH=os.path.join(cache_dir, "explanations.db"),
+                      BLURB_CACHE_PATH=os.path.join(cache_dir, "blurbs.db"))
+    if args.client_requests_per_min:
+        os.environ["GROQ_REQUESTS_PER_MIN"] = str(args.client_requests_per_min)
+    if args.client_tokens_per_min:
+        os.environ["GROQ_TOKENS_PER_MIN"] = str(args.client_tokens_per_min)
+    app = load_app(None)
+    app.st.session_state.chat_history = []
+
+    test = LoadTest(app, mix, args.requests, args.think_ms, not args.no_stream, args.seed)
+    print(f"{args.users} users, {args.requests} requests against {standin.url} "
+          f"(ttft {args.ttft}, {'blocking' if args.no_stream else 'streamed'})\n")
+    elapsed_s = test.run(args.users)
+    print_report(test, elapsed_s)
+
+    print(f"\nstand-in: {standin.stats()}")
+    print(f"rate limiter: {app.managed_groq.limiter.stats()}")
+    print(f"circuit breaker: {app.get_circuit_breaker().stats()}")
+    print(f"coalescing: {app.get_request_flights().stats()}")
+    print(f"response cache: {app.get_response_cache(app.semantic_index.fingerprint).stats()}")
+    if args.hedge:
+        print(f"hedging: {app.get_hedger().stats()}")
+    print(f"connections: {app.managed_groq.pool_stats()}")
+    app.managed_groq.close()
+    standin.stop()
+
+
+if __name__ == "__main__":
+    main()
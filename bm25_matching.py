@@ -0,0 +1,138 @@
+import math
+import re
+import numpy as np
+from collections import Counter
+from dataclasses import dataclass
+from service_matching import STOPWORDS, ServiceMatch, services_fingerprint
+
+K1 = 1.2
+B = 0.75
+# Each field's tokens count this many times towards a service's term frequency
+FIELD_WEIGHTS = {"name": 3, "keywords": 2, "info": 1, "contact": 1}
+# Runners-up scoring at least this fraction of the best are returned alongside it
+RELATED_RATIO = 0.8
+
+# ----------------------------- #
+# Tokenization
+# ----------------------------- #
+def stem(word):
+    """Very light suffix stripping so 'checking' meets 'check' and 'services' meets 'service'"""
+    if len(word) > 5 and word.endswith("ing"):
+        return word[:-3]
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    """Lower-cased, stemmed content words of text"""
+    words = re.sub(r"[\W_]+", " ", text.casefold()).split()
+    return [stem(w) for w in words if w not in STOPWORDS]
+
+
+def service_fields(service_name, service_data):
+    """(field, text) pairs indexed for one service"""
+    yield "name", service_name
+    for keyword in service_data.get('keywords', []):
+        yield "keywords", keyword
+    yield "info", service_data.get('info') or ""
+    for person in (service_data.get('contact') or {}):
+        yield "contact", person
+
+# ----------------------------- #
+# Sparse BM25 Index
+# ----------------------------- #
+@dataclass(frozen=True)
+class Bm25Index:
+    """Services x tokens BM25 weight matrix, stored column-wise (CSC)"""
+    fingerprint: str
+    services: tuple
+    vocabulary: dict        # token -> column
+    indptr: np.ndarray      # column slices into service_ids/weights
+    service_ids: np.ndarray
+    weights: np.ndarray
+
+
+def build_bm25_index(services, fingerprint=None):
+    """Index every service's name, keywords, info and contacts for BM25"""
+    names = tuple(services)
+    term_freqs = []
+    for service_name in names:
+        counts = Counter()
+        for field, text in service_fields(service_name, services[service_name]):
+            for token in tokenize(text):
+                counts[token] += FIELD_WEIGHTS[field]
+        term_freqs.append(counts)
+
+    doc_lengths = np.array([sum(tf.values()) for tf in term_freqs], dtype=np.float64)
+    avg_length = doc_lengths.mean() if len(names) else 1.0
+    postings = {}
+    for doc, counts in enumerate(term_freqs):
+        for token, tf in counts.items():
+            postings.setdefault(token, []).append((doc, tf))
+
+    vocabulary, indptr, service_ids, weights = {}, [0], [], []
+    for token in sorted(postings):
+        docs = postings[token]
+        idf = math.log(1 + (len(names) - len(docs) + 0.5) / (len(docs) + 0.5))
+        for doc, tf in docs:
+            norm = 1 - B + B * doc_lengths[doc] / avg_length
+            service_ids.append(doc)
+            weights.append(idf * tf * (K1 + 1) / (tf + K1 * norm))
+        vocabulary[token] = len(vocabulary)
+        indptr.append(len(service_ids))
+
+    return Bm25Index(
+        fingerprint=fingerprint or services_fingerprint(services),
+        services=names,
+        vocabulary=vocabulary,
+        indptr=np.asarray(indptr, dtype=np.int64),
+        service_ids=np.asarray(service_ids, dtype=np.int64),
+        weights=np.asarray(weights, dtype=np.float64)
+    )
+
+# ----------------------------- #
+# Scoring
+# ----------------------------- #
+def bm25_scores(index, query):
+    """BM25 score of query against every service (sparse dot product)"""
+    scores = np.zeros(len(index.services))
+    for token in set(tokenize(query)):
+        col = index.vocabulary.get(token)
+        if col is None:
+            continue
+        start, end = index.indptr[col], index.indptr[col + 1]
+        scores[index.service_ids[start:end]] += index.weights[start:end]
+    return scores
+
+
+def match_bm25(index, query, score_cutoff=0):
+    """Best services for query by BM25, as a ServiceMatch, or None"""
+    scores = bm25_scores(index, query)
+    if not len(scores):
+        return None
+    ranked = np.argsort(-scores, kind="stable")
+    best = scores[ranked[0]]
+    if best <= 0 or best < score_cutoff:
+        return None
+
+    services = tuple(index.services[i] for i in ranked if scores[i] >= RELATED_RATIO * best)
+    return ServiceMatch(
+        services=services,
+        term=" ".join(matched_tokens(index, query, ranked[0])),
+        score=round(float(best), 2)
+    )
+
+
+def matched_tokens(index, query, service_id):
+    """Query tokens that contributed to a service's score"""
+    tokens = []
+    for token in dict.fromkeys(tokenize(query)):
+        col = index.vocabulary.get(token)
+        if col is not None:
+            start, end = index.indptr[col], index.indptr[col + 1]
+            if service_id in index.service_ids[start:end]:
+                tokens.append(token)
+    return tokens
@@ -0,0 +1,228 @@
+import hashlib
+import re
+from dataclasses import dataclass
+
+import numpy as np
+from semantic_matching import embed, feature_matrix
+from service_matching import query_cache_key
+
+SKILL_LEVELS = ("Beginner", "Intermediate", "Advanced")
+ANY_LEVEL = "All"  # books suited to every level
+
+# Interest phrases that point at a catalog genre, besides the genre's own name
+GENRE_TERMS = {
+    "AI/ML": ("ai", "ml", "artificial intelligence", "machine learning", "deep learning",
+              "neural network", "neural networks", "tensorflow", "keras", "scikit"),
+    "Algorithms": ("algorithm", "algorithms", "data structures", "dsa"),
+    "Biology": ("biology", "evolution", "genetics", "gene", "genes"),
+    "Business": ("business", "management", "strategy", "leadership"),
+    "Computer Science": ("computer science", "cs", "operating systems", "operating system",
+                         "computer architecture", "os"),
+    "Data Science": ("data science", "data analysis", "analytics", "statistics", "big data",
+                     "data mining", "data analytics", "data visualization", "data scientist"),
+    "Database": ("database", "databases", "sql", "mongodb", "dbms", "mysql", "nosql"),
+    "Entrepreneurship": ("entrepreneurship", "startup", "startups", "founder"),
+    "History": ("history", "civilization", "historical"),
+    "Literature": ("literature", "novel", "novels", "fiction", "classics", "classic",
+                   "story", "stories"),
+    "Marketing": ("marketing", "advertising", "branding", "digital marketing", "seo"),
+    "Networking": ("networking", "network", "networks", "tcp", "internet"),
+    "Philosophy": ("philosophy", "ethics", "stoicism", "existentialism"),
+    "Programming": ("programming", "coding", "code", "python", "programmer"),
+    "Psychology": ("psychology", "behavior", "behaviour", "persuasion", "mind"),
+    "Science": ("science", "physics", "astronomy", "astrophysics", "cosmology", "space"),
+    "Self-help": ("self help", "self-help", "habits", "productivity", "motivation", "focus"),
+    "Software Development": ("software development", "software engineering", "design patterns",
+                             "refactoring", "clean code"),
+    "Web Development": ("web development", "web", "javascript", "html", "css", "django",
+                        "frontend", "backend", "vue", "react", "website", "websites"),
+}
+# Genres worth suggesting alongside a requested one, at half the genre weight
+RELATED_GENRES = {
+    "AI/ML": ("Data Science", "Algorithms"),
+    "Algorithms": ("Computer Science", "Programming"),
+    "Business": ("Entrepreneurship", "Marketing"),
+    "Computer Science": ("Algorithms", "Networking"),
+    "Data Science": ("AI/ML", "Database"),
+    "Database": ("Data Science",),
+    "Entrepreneurship": ("Business", "Marketing"),
+    "Marketing": ("Business",),
+    "Programming": ("Software Development", "Web Development"),
+    "Psychology": ("Self-help",),
+    "Self-help": ("Psychology",),
+    "Software Development": ("Programming",),
+    "Web Development": ("Programming",),
+}
+SKILL_TERMS = {
+    "Beginner": ("beginner", "beginners", "intro", "introduction", "introductory", "basic",
+                 "basics", "starter", "newbie", "novice", "first"),
+    "Intermediate": ("intermediate",),
+    "Advanced": ("advanced", "expert", "experts", "graduate", "in depth", "in-depth"),
+}
+
+# Ranking: genre fit, text similarity and skill fit, then availability
+GENRE_WEIGHT = 0.5
+SIMILARITY_WEIGHT = 0.4
+SKILL_WEIGHT = 0.1
+AVAILABILITY_BOOST = 1.25  # an available book outranks a checked-out one of similar fit
+MIN_SIMILARITY = 0.3       # text-only candidates need at least this text fit
+
+
+def _phrase_pattern(phrases):
+    return re.compile(r"\b(?:" + "|".join(
+        re.escape(p) for p in sorted(phrases, key=len, reverse=True)) + r")\b")
+
+
+# One pattern over every genre phrase, longest first, so a phrase claims its
+# words: "data structures" is Algorithms only, "data science" not Science
+_PHRASE_GENRES = {phrase: genre for genre, terms in GENRE_TERMS.items()
+                  for phrase in (genre.casefold(),) + terms}
+_GENRE_PATTERN = _phrase_pattern(_PHRASE_GENRES)
+_SKILL_PATTERNS = {level: _phrase_pattern(terms) for level, terms in SKILL_TERMS.items()}
+
+# ----------------------------- #
+# Interest Parsing
+# ----------------------------- #
+@dataclass(frozen=True)
+class Interest:
+    """What a reader asked for: genres, skill level and the remaining topic words"""
+    text: str
+    genres: tuple         # genres named by the interest, in catalog order
+    related: tuple        # genres related to those, not named themselves
+    skill: str = None     # one of SKILL_LEVELS, or None for any level
+    topic: str = ""       # normalized interest, for text similarity
+
+    @property
+    def cluster(self):
+        """Key shared by interests that should get the same blurbs"""
+        subject = "+".join(self.genres) if self.genres else f"topic:{self.topic}"
+        return f"{subject}|{self.skill or 'any'}"
+
+    @property
+    def label(self):
+        """Human-readable cluster, for prompts"""
+        subject = " / ".join(self.genres) if self.genres else self.topic or self.text
+        return f"{subject} ({self.skill.lower()} level)" if self.skill else subject
+
+
+def parse_interest(text, skill=None):
+    """Interest from free text; an explicit skill overrides one named in the text"""
+    lowered = " ".join(text.casefold().split())
+    named = {_PHRASE_GENRES[m.group()] for m in _GENRE_PATTERN.finditer(lowered)}
+    genres = tuple(genre for genre in GENRE_TERMS if genre in named)
+    related = tuple(dict.fromkeys(
+        r for genre in genres for r in RELATED_GENRES.get(genre, ()) if r not in genres))
+    if skill not in SKILL_LEVELS:
+        skill = next((level for level, pattern in _SKILL_PATTERNS.items()
+                      if pattern.search(lowered)), None)
+    return Interest(text=text, genres=genres, related=related, skill=skill,
+                    topic=query_cache_key(text))
+
+
+def skill_fit(wanted, level):
+    """1 for the wanted level, less for "All" or a neighbouring level"""
+    if wanted is None:
+        return 0.5
+    if level == ANY_LEVEL:
+        return 0.75
+    if level not in SKILL_LEVELS:
+        return 0.0
+    distance = abs(SKILL_LEVELS.index(wanted) - SKILL_LEVELS.index(level))
+    return (1.0, 0.4, 0.0)[distance]
+
+# ----------------------------- #
+# Book Index
+# ----------------------------- #
+@dataclass(frozen=True)
+class BookIndex:
+    """Catalog columns and text embeddings, one row per book"""
+    fingerprint: str
+    titles: tuple
+    authors: tuple
+    genres: tuple
+    skills: tuple
+    locations: tuple
+    words: tuple          # frozenset of title and author words per book
+    bucket_weights: np.ndarray
+    embeddings: np.ndarray
+
+
+def books_fingerprint(books):
+    """Hash of the catalog columns the index depends on (not availability)"""
+    columns = ["Title", "Author", "Genre", "Skill_Level", "Location"]
+    payload = books[columns].to_csv(index=False) if len(books) else ""
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def book_text(title, author, genre):
+    """Text embedded for one book: its title, author, genre and genre terms"""
+    return " ".join((title, author, genre) + GENRE_TERMS.get(genre, ())[:4])
+
+
+def build_book_index(books):
+    """BookIndex over a books DataFrame (Title, Author, Genre, Skill_Level, Location)"""
+    rows = books[["Title", "Author", "Genre", "Skill_Level", "Location"]].astype(str)
+    titles, authors, genres, skills, locations = (tuple(rows[c]) for c in rows.columns)
+    texts = [book_text(*book) for book in zip(titles, authors, genres)]
+    # Same IDF weighting as the service embeddings, over the book texts
+    doc_freq = np.count_nonzero(feature_matrix(texts), axis=0)
+    bucket_weights = (np.log((1 + len(texts)) / (1 + doc_freq)) + 1).astype(np.float32)
+    return BookIndex(
+        fingerprint=books_fingerprint(books),
+        titles=titles, authors=authors, genres=genres, skills=skills, locations=locations,
+        words=tuple(frozenset(re.findall(r"\w+", f"{t} {a}".casefold()))
+                    for t, a in zip(titles, authors)),
+        bucket_weights=bucket_weights,
+        embeddings=embed(texts, bucket_weights) if texts else np.zeros((0, 0), np.float32)
+    )
+
+# ----------------------------- #
+# Recommendations
+# ----------------------------- #
+@dataclass(frozen=True)
+class Recommendation:
+    title: str
+    author: str
+    genre: str
+    skill_level: str
+    location: str
+    available: bool
+    score: float
+    reason: str
+
+
+def recommend(index, interest, available=None, limit=5):
+    """Best catalog books for an Interest, highest score first
+
+    Text fit is the larger of the embedding similarity and the share of
+    topic words found in the title or author. Candidates are books in a
+    named or related genre, or with a text fit of at least MIN_SIMILARITY.
+    available (one bool per book, in index order) boosts books on the
+    shelf; by default all are.
+    """
+    if not index.titles:
+        return []
+    named, related = set(interest.genres), set(interest.related)
+    genre_fit = np.array([1.0 if g in named else 0.5 if g in related else 0.0
+                          for g in index.genres])
+    similarity = np.maximum(index.embeddings @ embed([interest.topic or interest.text],
+                                                     index.bucket_weights)[0], 0)
+    topic_words = set(interest.topic.split())
+    if topic_words:
+        overlap = np.array([len(topic_words & words) / len(topic_words) for words in index.words])
+        similarity = np.maximum(similarity, overlap)
+    skill = np.array([skill_fit(interest.skill, level) for level in index.skills])
+    on_shelf = np.ones(len(index.titles), bool) if available is None else np.asarray(available)
+    scores = (GENRE_WEIGHT * genre_fit + SIMILARITY_WEIGHT * similarity + SKILL_WEIGHT * skill) \
+        * np.where(on_shelf, AVAILABILITY_BOOST, 1.0)
+
+    candidates = np.flatnonzero((genre_fit > 0) | (similarity >= MIN_SIMILARITY))
+    ranked = candidates[np.argsort(-scores[candidates], kind="stable")][:limit]
+    return [Recommendation(
+        title=index.titles[i], author=index.authors[i], genre=index.genres[i],
+        skill_level=index.skills[i], location=index.locations[i],
+        available=bool(on_shelf[i]), score=round(float(scores[i]), 3),
+        reason=(index.genres[i] if genre_fit[i] == 1 else
+                f"related to {' / '.join(interest.genres)}" if genre_fit[i] else
+                "matches title or author")
+    ) for i in ranked]
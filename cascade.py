@@ -0,0 +1,95 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------- #
+# Query Cascade
+# ----------------------------- #
+@dataclass(frozen=True)
+class Stage:
+    """One step of the cascade: run(query) returns an answer or None"""
+    name: str
+    run: object
+    budget_ms: float
+    required: bool = False  # never skipped, even when the cascade is behind schedule
+
+
+@dataclass
+class CascadeResult:
+    """Which stage answered a query, and what each stage cost"""
+    answer: object = None
+    stage: str = None
+    timings_ms: dict = field(default_factory=dict)
+    skipped: list = field(default_factory=list)
+    over_budget: list = field(default_factory=list)
+
+
+class CascadeStats:
+    """Process-wide per-stage counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = defaultdict(lambda: {
+            "attempted": 0, "answered": 0, "skipped": 0, "over_budget": 0, "total_ms": 0.0
+        })
+
+    def record(self, result):
+        with self._lock:
+            for name, elapsed in result.timings_ms.items():
+                stage = self._stages[name]
+                stage["attempted"] += 1
+                stage["total_ms"] += elapsed
+            for name in result.skipped:
+                self._stages[name]["skipped"] += 1
+            for name in result.over_budget:
+                self._stages[name]["over_budget"] += 1
+            if result.stage:
+                self._stages[result.stage]["answered"] += 1
+
+    def snapshot(self):
+        """{stage: counters plus mean latency}"""
+        with self._lock:
+            return {
+                name: dict(c, mean_ms=c["total_ms"] / c["attempted"] if c["attempted"] else 0.0)
+                for name, c in self._stages.items()
+            }
+
+
+def run_cascade(stages, query, stats=None):
+    """Try stages cheapest first and return a CascadeResult for the first answer
+
+    Budgets are cumulative: a stage is skipped when the cascade has already
+    spent more than the budgets of every stage before it, so a slow local
+    stage hands over to the next required stage instead of piling on.
+    """
+    result = CascadeResult()
+    start = time.perf_counter()
+    scheduled_ms = 0.0
+
+    for stage in stages:
+        spent_ms = (time.perf_counter() - start) * 1000
+        if not stage.required and scheduled_ms and spent_ms > scheduled_ms:
+            result.skipped.append(stage.name)
+            scheduled_ms += stage.budget_ms
+            continue
+        scheduled_ms += stage.budget_ms
+
+        stage_start = time.perf_counter()
+        answer = stage.run(query)
+        elapsed_ms = (time.perf_counter() - stage_start) * 1000
+        result.timings_ms[stage.name] = elapsed_ms
+        if elapsed_ms > stage.budget_ms:
+            result.over_budget.append(stage.name)
+            logger.warning("Cascade stage %s took %.1f ms (budget %.1f ms)",
+                           stage.name, elapsed_ms, stage.budget_ms)
+        if answer:
+            result.answer, result.stage = answer, stage.name
+            break
+
+    if stats is not None:
+        stats.record(result)
+    return result
@@ -0,0 +1,107 @@
+import re
+from functools import lru_cache
+
+SUMMARY_TOKENS = 60  # cap on a summarized older turn
+
+_OVERVIEW = re.compile(r"\n*\*\*🤖 AI Overview:\*\*.*?(?=\n\n\*\*Other services matching|\Z)", re.S)
+_URL_LINE = re.compile(r"^\s*\*\*🔗[^\n]*$", re.M)
+_MD_LINK = re.compile(r"\[([^\]]*)\]\((?:https?://|www\.)[^)]*\)")
+_URL = re.compile(r"(?:https?://|www\.)\S+")
+_HTML = re.compile(r"<[^>]+>")
+_CARD_TITLE = re.compile(r"\*\*📚 (.+?) Service\*\*")
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+# ----------------------------- #
+# Token Counting
+# ----------------------------- #
+def count_tokens(text):
+    """Approximate Llama 3 token count: words and punctuation marks, plus 10%
+
+    Long words split into several BPE pieces; the margin keeps estimates on
+    the safe side without shipping the model's tokenizer.
+    """
+    return (len(_TOKEN.findall(text)) * 11 + 9) // 10
+
+# ----------------------------- #
+# Turn Cleaning & Summaries
+# ----------------------------- #
+@lru_cache(maxsize=4096)
+def clean_turn(content):
+    """Message text without AI-overview blocks, URLs, markup or blank runs"""
+    text = _OVERVIEW.sub("", content)
+    text = _URL_LINE.sub("", text)
+    text = _MD_LINK.sub(r"\1", text)
+    text = _URL.sub("", text)
+    text = _HTML.sub("", text)
+    text = re.sub(r"[#*_`>]+", "", text)
+    text = re.sub(r"[ \t]+", " ", text)
+    return re.sub(r"\s*\n\s*", "\n", text).strip()
+
+
+def _truncate(text, max_tokens):
+    """Leading sentences of text that fit in max_tokens, or its first words"""
+    sentences = [s for s in re.split(r"(?<=[.!?])\s+|\n+", text) if s]
+    out, used = [], 0
+    for sentence in sentences:
+        tokens = count_tokens(sentence)
+        if used + tokens > max_tokens:
+            break
+        out.append(sentence)
+        used += tokens
+    if not out:  # the first sentence alone is too long
+        return " ".join(text.split()[:max_tokens // 2]) + " …"
+    return " ".join(out) + (" …" if len(out) < len(sentences) else "")
+
+
+@lru_cache(maxsize=4096)
+def summarize_turn(role, content):
+    """Short stand-in for an older turn
+
+    Service answers become the names of the services shown plus the first
+    sentence of the top card; other turns keep their leading sentences.
+    """
+    titles = _CARD_TITLE.findall(content)
+    text = clean_turn(content)
+    if role == "assistant" and titles:
+        body = text.split("\n", 2)[1] if text.count("\n") else ""
+        lead = _truncate(body, SUMMARY_TOKENS // 2) if body else ""
+        return f"(Showed service info: {', '.join(titles)}.) {lead}".strip()
+    if count_tokens(text) <= SUMMARY_TOKENS:
+        return text
+    return _truncate(text, SUMMARY_TOKENS)
+
+# ----------------------------- #
+# Context Builder
+# ----------------------------- #
+def build_context(history, budget_tokens, max_messages=10, verbatim_messages=2, query=None):
+    """Recent chat turns packed into budget_tokens, oldest first, as role/content dicts
+
+    The newest verbatim_messages turns are kept whole (minus overviews and
+    URLs) when they fit; older ones are summarized. Turns are added newest
+    first until the budget runs out. A trailing user message equal to query
+    is left out, since the caller sends the query itself. Returns
+    (messages, tokens used).
+    """
+    turns = list(history)
+    if query is not None and turns and turns[-1].get("role") == "user" \
+            and turns[-1].get("content") == query:
+        turns.pop()
+
+    packed, used = [], 0
+    for age, message in enumerate(reversed(turns[-max_messages:])):
+        role, content = message["role"], message["content"]
+        candidates = [summarize_turn(role, content)]
+        if not candidates[0]:
+            continue  # nothing left once markup is stripped
+        if age < verbatim_messages:
+            candidates.insert(0, clean_turn(content))
+        for text in candidates:
+            tokens = count_tokens(text)
+            if used + tokens <= budget_tokens:
+                packed.append({"role": role, "content": text})
+                used += tokens
+                break
+        else:
+            break  # an older turn would not make sense without this one
+    packed.reverse()
+    return packed, used
@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """The upstream is considered down; the call was not attempted"""
+
+    def __init__(self, retry_in_s):
+        super().__init__(f"Groq temporarily unavailable; retrying in {retry_in_s:.0f} s")
+        self.retry_in_s = retry_in_s
+
+# ----------------------------- #
+# Circuit Breaker
+# ----------------------------- #
+class CircuitBreaker:
+    """Fail fast while an upstream is down, probing now and then for recovery
+
+    Closed: calls go through; failure_threshold consecutive failures open
+    the circuit. A call whose first token took longer than slow_call_ms
+    (the latency SLO) counts as a failure even when it succeeds. Open:
+    calls are rejected with CircuitOpenError for open_s. Half-open: up to
+    half_open_calls probes go through; a success closes the circuit, a
+    failure reopens it.
+    """
+
+    def __init__(self, failure_threshold=3, slow_call_ms=10000, open_s=30.0,
+                 half_open_calls=1, name="groq"):
+        self.failure_threshold = failure_threshold
+        self.slow_call_ms = slow_call_ms
+        self.open_s = open_s
+        self.half_open_calls = half_open_calls
+        self.name = name
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._stats = Counter()
+
+    def _transition(self, state, reason=""):
+        if state != self._state:
+            logger.warning("Circuit %s %s -> %s %s", self.name, self._state, state, reason)
+            self._stats[f"to_{state}"] += 1
+        self._state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        if state != HALF_OPEN:
+            self._probes = 0
+
+    def _current_state(self, now):
+        if self._state == OPEN and now - self._opened_at >= self.open_s:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    def allows_calls(self):
+        """False while calls would be rejected; does not reserve a probe"""
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            return state == CLOSED or (state == HALF_OPEN and self._probes < self.half_open_calls)
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError; pair with a record_* or cancel()"""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and self._probes < self.half_open_calls:
+                self._probes += 1
+                self._stats["probes"] += 1
+                return
+            self._stats["rejected"] += 1
+            retry_in_s = max(self.open_s - (now - self._opened_at), 0.0) if state == OPEN else 1.0
+        raise CircuitOpenError(retry_in_s)
+
+    def cancel(self):
+        """Give back an admission whose call never reached the upstream"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes:
+                self._probes -= 1
+
+    def record_success(self, latency_ms=None):
+        """A completed call; latency_ms is its first-token time, None if unknown"""
+        with self._lock:
+            if latency_ms is not None and latency_ms > self.slow_call_ms:
+                self._stats["slow"] += 1
+                self._fail(f"(slow call: {latency_ms:.0f} ms)")
+                return
+            self._stats["successes"] += 1
+            self._failures = 0
+            if self._state == HALF_OPEN:
+                self._transition(CLOSED, "(probe succeeded)")
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self._stats["failures"] += 1
+            self._fail(f"({type(error).__name__})" if error is not None else "")
+
+    def _fail(self, reason):
+        self._failures += 1
+        if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+            self._transition(OPEN, reason)
+
+    def stats(self):
+        """State, seconds until the next probe, and counters"""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            stats = dict(self._stats)
+            stats.update(state=state, consecutive_failures=self._failures,
+                         retry_in_s=max(self.open_s - (now - self._opened_at), 0.0)
+                         if state == OPEN else 0.0)
+        return stats
@@ -0,0 +1,193 @@
+"""Persistent cache of AI service explanations
+
+Entries live in a small SQLite file so they survive restarts and are shared
+by every worker process on the host. Each entry is keyed by service name,
+prompt template version and model, and expires after a TTL.
+
+    python explanation_cache.py stats
+    python explanation_cache.py invalidate                     # everything
+    python explanation_cache.py invalidate "library clearance service"
+    python explanation_cache.py purge                          # expired only
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = os.getenv(
+    "EXPLANATION_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "explanations.sqlite3")
+)
+TTL_S = float(os.getenv("EXPLANATION_CACHE_TTL_S", 7 * 24 * 3600))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS explanations (
+    service TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    model TEXT NOT NULL,
+    text TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (service, prompt_version, model)
+)
+"""
+
+# ----------------------------- #
+# Explanation Cache
+# ----------------------------- #
+class ExplanationCache:
+    """TTL cache of explanation text on disk; safe across threads and processes
+
+    Storage errors are logged and treated as misses, so a read-only or full
+    disk costs an LLM call instead of an error in the chat.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl_s=TTL_S):
+        self.path = path
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._ready = False
+
+    def _connect(self):
+        # One short-lived connection per call: sqlite3 connections must not be
+        # shared across Streamlit's script threads
+        if not self._ready:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5)
+        if not self._ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            conn.commit()
+            self._ready = True
+        return conn
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+    def get(self, service, prompt_version, model):
+        """Cached explanation text, or None when absent or expired"""
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT text FROM explanations WHERE service = ? AND prompt_version = ? "
+                    "AND model = ? AND expires_at > ?",
+                    (service, str(prompt_version), model, time.time())
+                ).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning("Explanation cache read failed: %s", e)
+            row = None
+        self._count(row is not None)
+        return row[0] if row else None
+
+    def missing(self, services, prompt_version, model):
+        """Services with no live entry for the key; not counted as hits or misses"""
+        services = list(services)
+        try:
+            conn = self._connect()
+            try:
+                cached = {row[0] for row in conn.execute(
+                    "SELECT service FROM explanations WHERE prompt_version = ? "
+                    "AND model = ? AND expires_at > ?",
+                    (str(prompt_version), model, time.time())
+                )}
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning("Explanation cache read failed: %s", e)
+            return services
+        return [s for s in services if s not in cached]
+
+    def put(self, service, prompt_version, model, text):
+        """Store text for the key, replacing any previous entry"""
+        now = time.time()
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO explanations VALUES (?, ?, ?, ?, ?, ?)",
+                        (service, str(prompt_version), model, text, now, now + self.ttl_s)
+                    )
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning("Explanation cache write failed: %s", e)
+
+    def _delete(self, where, params):
+        conn = self._connect()
+        try:
+            with conn:
+                return conn.execute(f"DELETE FROM explanations WHERE {where}", params).rowcount
+        finally:
+            conn.close()
+
+    def invalidate(self, services=None):
+        """Drop entries for the given services (all services when None); returns count"""
+        if services is None:
+            return self._delete("1", ())
+        services = list(services)
+        placeholders = ", ".join("?" * len(services))
+        return self._delete(f"service IN ({placeholders})", services) if services else 0
+
+    def purge_expired(self):
+        """Delete expired entries; returns count"""
+        return self._delete("expires_at <= ?", (time.time(),))
+
+    def stats(self):
+        """This process's hits/misses plus entry counts on disk"""
+        with self._lock:
+            stats = {"hits": self._hits, "misses": self._misses}
+        try:
+            conn = self._connect()
+            try:
+                stats["entries"], stats["expired"] = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(expires_at <= ?), 0) FROM explanations",
+                    (time.time(),)
+                ).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning("Explanation cache stats failed: %s", e)
+            stats["entries"] = stats["expired"] = None
+        return stats
+
+# ----------------------------- #
+# Command Line
+# ----------------------------- #
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--path", default=CACHE_PATH, help="cache database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    invalidate = commands.add_parser("invalidate", help="drop cached explanations")
+    invalidate.add_argument("services", nargs="*",
+                            help="service names as in library_services.json (default: all)")
+    commands.add_parser("purge", help="drop expired explanations")
+    commands.add_parser("stats", help="show entry counts")
+    args = parser.parse_args()
+
+    cache = ExplanationCache(args.path)
+    if args.command == "invalidate":
+        removed = cache.invalidate([s.lower() for s in args.services] or None)
+        print(f"Removed {removed} cached explanation(s)")
+    elif args.command == "purge":
+        print(f"Removed {cache.purge_expired()} expired explanation(s)")
+    else:
+        stats = cache.stats()
+        print(f"{stats['entries']} cached explanation(s), {stats['expired']} expired")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import numpy as np
+
+
+class CompletionCancelled(Exception):
+    """A hedged attempt lost the race and was stopped"""
+
+
+class Cancellation:
+    """Cancel flag for one attempt that also closes its open response"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._set = False
+        self._closers = []
+
+    def on_cancel(self, close):
+        """Call close() on cancellation (immediately if already cancelled)"""
+        with self._lock:
+            if not self._set:
+                self._closers.append(close)
+                return
+        close()
+
+    def set(self):
+        with self._lock:
+            self._set, closers, self._closers = True, self._closers, []
+        for close in closers:
+            try:
+                close()
+            except Exception:
+                pass  # the attempt notices the flag at its next chunk anyway
+
+    def is_set(self):
+        return self._set
+
+# ----------------------------- #
+# Hedged Requests
+# ----------------------------- #
+class Hedger:
+    """Second identical request for calls that are slow to start
+
+    When an attempt has streamed no token after the percentile-th
+    time-to-first-token of recent calls with the same key (never less than
+    min_delay_ms; default_delay_ms until min_samples are known), one hedge
+    is sent. The first attempt to stream a token, or to finish, wins and the
+    other is cancelled. Across all keys at most max_hedge_ratio of the
+    recent window calls (and at least one) may be hedged, so an incident
+    that slows every call cannot double the load.
+    """
+
+    def __init__(self, pool, percentile=95, min_delay_ms=300, default_delay_ms=2000,
+                 max_hedge_ratio=0.1, min_samples=20, window=200):
+        self.pool = pool
+        self.percentile = percentile
+        self.min_delay_ms = min_delay_ms
+        self.default_delay_ms = default_delay_ms
+        self.max_hedge_ratio = max_hedge_ratio
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._ttft_ms = defaultdict(lambda: deque(maxlen=window))
+        self._recent = deque(maxlen=window)  # [hedged] per recent call
+        self._stats = Counter()
+
+    def delay_ms(self, key):
+        """Time without a first token after which a call for key is hedged"""
+        with self._lock:
+            samples = list(self._ttft_ms[key])
+        if len(samples) < self.min_samples:
+            return self.default_delay_ms
+        return max(float(np.percentile(samples, self.percentile)), self.min_delay_ms)
+
+    def _reserve_hedge(self, call):
+        """Claim a hedge for call under the global cap; False when it would exceed it"""
+        with self._lock:
+            budget = max(self.max_hedge_ratio * len(self._recent), 1)
+            if sum(hedged for hedged, in self._recent) + 1 > budget:
+                self._stats["capped"] += 1
+                return False
+            call[0] = True
+            self._stats["hedged"] += 1
+            return True
+
+    def run(self, attempt, key="", on_text=None, poll_s=0.05):
+        """Result of attempt(on_text=..., cancel=..., hedge=...), hedged when slow
+
+        attempt must stream through its on_text and stop with an exception
+        once cancel (a Cancellation) is set; hedge is True for the second
+        request. Streamed text of the winning attempt is relayed to on_text
+        from the calling thread. When the first attempt fails before a hedge
+        is sent its error is raised; once hedged, the other attempt is
+        awaited and the first error raised only if both fail.
+        """
+        lock = threading.Lock()
+        state = {"winner": None, "text": None}
+        attempts = []  # (future, cancellation, [start]); start is None while queued in the pool
+
+        def decide(i):
+            """Make attempt i the winner unless one already is; caller holds lock"""
+            if state["winner"] is None:
+                state["winner"] = i
+                for j, (_, cancel, _) in enumerate(attempts):
+                    if j != i:
+                        cancel.set()
+            return state["winner"] == i
+
+        def launch(i):
+            # The clock starts when a pool worker picks the attempt up, so time
+            # queued behind other calls is not mistaken for a slow first token
+            cancel, start = Cancellation(), [None]
+
+            def collect(text):
+                with lock:
+                    first = state["winner"] is None
+                    if not decide(i):
+                        raise CompletionCancelled()
+                    state["text"] = text
+                if first:
+                    self._record_ttft(key, (time.monotonic() - start[0]) * 1000)
+
+            def run():
+                start[0] = time.monotonic()
+                return attempt(on_text=collect, cancel=cancel, hedge=i > 0)
+
+            with lock:
+                attempts.append((self.pool.submit(run), cancel, start))
+
+        call = [False]
+        with self._lock:
+            self._recent.append(call)
+            self._stats["calls"] += 1
+        launch(0)
+        delay_s = self.delay_ms(key) / 1000
+        hedged, shown = False, None
+        while True:
+            now = time.monotonic()
+            started = attempts[0][2][0]
+            hedge_at = None if started is None else started + delay_s
+            futures = [future for future, _, _ in attempts]
+            timeout = poll_s if hedged or hedge_at is None or state["winner"] is not None \
+                else min(poll_s, max(hedge_at - now, 0))
+            wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+            with lock:
+                for i, future in enumerate(futures):
+                    if future.done() and future.exception() is None:
+                        decide(i)  # finished without streaming any text
+                winner, text = state["winner"], state["text"]
+            if on_text and text is not shown:
+                shown = text
+                on_text(text)
+            if winner is not None and futures[winner].done():
+                if winner > 0 and futures[winner].exception() is None:
+                    with self._lock:
+                        self._stats["hedge_wins"] += 1
+                return futures[winner].result()
+            if winner is None and all(future.done() for future in futures):
+                raise futures[0].exception()
+            if not hedged and winner is None and hedge_at is not None \
+                    and time.monotonic() >= hedge_at and not futures[0].done():
+                hedged = True
+                if self._reserve_hedge(call):
+                    launch(1)
+
+    def _record_ttft(self, key, ttft_ms):
+        with self._lock:
+            self._ttft_ms[key].append(ttft_ms)
+
+    def stats(self):
+        """calls, hedged, hedge_wins, capped, and the hedge rate over the recent window"""
+        with self._lock:
+            stats = {k: self._stats[k] for k in ("calls", "hedged", "hedge_wins", "capped")}
+            hedged = sum(hedged for hedged, in self._recent)
+            stats["recent_hedge_rate"] = hedged / len(self._recent) if self._recent else 0.0
+        return stats
@@ -0,0 +1,117 @@
+import logging
+import threading
+from collections import Counter
+
+import httpx
+from groq import Groq
+
+logger = logging.getLogger(__name__)
+
+# Timeout and retry policy per kind of call. Interactive calls fail fast so
+# the user sees the static card or an error quickly; background warm-up can
+# afford to wait out a slow or rate-limited API.
+CLIENT_PROFILES = {
+    "chat":            {"timeout": httpx.Timeout(30.0, connect=3.0), "max_retries": 1},
+    "explanation":     {"timeout": httpx.Timeout(20.0, connect=3.0), "max_retries": 1},
+    "recommendations": {"timeout": httpx.Timeout(15.0, connect=3.0), "max_retries": 1},
+    "prewarm":         {"timeout": httpx.Timeout(60.0, connect=5.0), "max_retries": 4},
+}
+DEFAULT_PROFILE = "chat"
+
+
+def capped_timeout(profile, seconds):
+    """Per-request timeout of at most seconds that keeps the profile's connect timeout
+
+    A plain float passed as a request's timeout replaces the whole profile
+    timeout, connect limit included.
+    """
+    timeout = CLIENT_PROFILES.get(profile, CLIENT_PROFILES[DEFAULT_PROFILE])["timeout"]
+    return httpx.Timeout(seconds, connect=min(timeout.connect, seconds))
+
+# ----------------------------- #
+# Managed Groq Client
+# ----------------------------- #
+class _CountingTransport(httpx.BaseTransport):
+    """Counts requests awaiting a response, including ones that end in an error"""
+
+    def __init__(self, transport, counts, lock):
+        self.transport = transport
+        self._counts = counts
+        self._lock = lock
+
+    def handle_request(self, request):
+        with self._lock:
+            self._counts["in_flight"] += 1
+        try:
+            return self.transport.handle_request(request)
+        except httpx.TransportError:
+            with self._lock:
+                self._counts["transport_errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._counts["in_flight"] -= 1
+
+    def close(self):
+        self.transport.close()
+
+
+class ManagedGroq:
+    """One pooled HTTP connection set shared by per-profile Groq clients
+
+    Every profile client is a Groq.copy() of the same base client, so they
+    share one httpx.Client and its keep-alive connections; only timeouts and
+    retries differ.
+    """
+
+    def __init__(self, api_key, max_connections=20, max_keepalive_connections=10,
+                 keepalive_expiry_s=30.0, base_url=None, profiles=CLIENT_PROFILES,
+                 limiter=None):
+        self.limiter = limiter  # fed the rate-limit headers of every response
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive_connections,
+                                   keepalive_expiry=keepalive_expiry_s)
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._transport = httpx.HTTPTransport(limits=self.limits)
+        self.http_client = httpx.Client(
+            transport=_CountingTransport(self._transport, self._counts, self._lock),
+            limits=self.limits,
+            timeout=profiles[DEFAULT_PROFILE]["timeout"],
+            event_hooks={"request": [self._on_request], "response": [self._on_response]}
+        )
+        self.client = Groq(api_key=api_key, base_url=base_url, http_client=self.http_client,
+                           **profiles[DEFAULT_PROFILE])
+        self._profiles = {name: self.client.copy(**options) for name, options in profiles.items()}
+
+    def profile(self, name):
+        """Groq client tuned for one kind of call; unknown names get the default"""
+        return self._profiles.get(name, self.client)
+
+    def _on_request(self, request):
+        with self._lock:
+            self._counts["requests"] += 1
+
+    def _on_response(self, response):
+        with self._lock:
+            self._counts[f"status_{response.status_code // 100}xx"] += 1
+        if self.limiter is not None:
+            self.limiter.observe(response.headers, response.status_code)
+
+    def pool_stats(self):
+        """Connection pool and request counters, for monitoring"""
+        with self._lock:
+            stats = dict(self._counts)
+        stats.update(max_connections=self.limits.max_connections,
+                     max_keepalive=self.limits.max_keepalive_connections)
+        # httpcore exposes live connections only on its (undocumented) pool
+        pool = getattr(self._transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        stats["connections"] = len(connections)
+        stats["idle_connections"] = sum(1 for c in connections if c.is_idle())
+        stats["queued_requests"] = sum(1 for r in list(getattr(pool, "_requests", []))
+                                       if r.is_queued())
+        return stats
+
+    def close(self):
+        self.http_client.close()
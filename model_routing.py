@@ -0,0 +1,156 @@
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from dataclasses import dataclass
+
+import numpy as np
+from circuit_breaker import CircuitOpenError
+from rate_limit import RateLimitTimeout
+
+SMALL_MODEL = "llama3-8b-8192"
+LARGE_MODEL = "llama3-70b-8192"
+MODELS = {"small": SMALL_MODEL, "large": LARGE_MODEL}
+
+SMALL_MAX_WORDS = 12         # longer questions go to the large model
+SMALL_MAX_CONTEXT_TOKENS = 300  # as does a query leaning on a long conversation
+
+CHITCHAT_WORDS = frozenset({
+    "thanks", "thank", "thx", "ty", "ok", "okay", "hi", "hello", "hey", "bye", "goodbye",
+    "great", "cool", "nice", "good", "welcome", "you", "so", "much", "a", "lot", "very",
+    "morning", "evening", "night", "got", "it", "dhonnobad", "bhai", "vai", "apu",
+})
+REASONING_CUES = frozenset({
+    "explain", "why", "compare", "difference", "differences", "analyze", "analyse",
+    "recommend", "suggest", "write", "essay", "summarize", "summarise", "code", "program",
+    "solve", "calculate", "plan", "pros", "cons", "evaluate", "describe", "steps", "derive",
+})
+_REFUSAL = re.compile(
+    r"\b(i(?: am|'m) not sure|i (?:can ?not|can't|don't) (?:help|answer|know)|as an ai\b|"
+    r"i do not have (?:access|information))", re.I
+)
+
+
+@dataclass(frozen=True)
+class Route:
+    name: str    # "small" or "large"
+    reason: str
+
+    @property
+    def model(self):
+        return MODELS[self.name]
+
+# ----------------------------- #
+# Local Classifier
+# ----------------------------- #
+def classify(query, context_tokens=0, context_attached=False):
+    """Route for a request from its query length, intent and attached context"""
+    words = re.findall(r"[a-z']+", query.casefold())
+    if context_attached:
+        return Route("large", "service or catalog context")
+    if words and set(words) <= CHITCHAT_WORDS:
+        return Route("small", "chit-chat")
+    if REASONING_CUES.intersection(words):
+        return Route("large", "reasoning intent")
+    if len(words) > SMALL_MAX_WORDS:
+        return Route("large", "long query")
+    if context_tokens > SMALL_MAX_CONTEXT_TOKENS:
+        return Route("large", "long context")
+    return Route("small", "short lookup")
+
+
+def quality_problem(answer, route):
+    """Why a small-model answer should be escalated, or None when it looks fine"""
+    text = (answer or "").strip()
+    if not text:
+        return "empty"
+    if _REFUSAL.search(text):
+        return "refusal"
+    if route.reason != "chit-chat" and len(text.split()) < 8:
+        return "too short"
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if lines and max(Counter(lines).values()) >= 3:
+        return "repetition"
+    if len(text) > 200 and text[-1].isalnum():
+        return "truncated"
+    return None
+
+# ----------------------------- #
+# Routing Metrics
+# ----------------------------- #
+class RoutingStats:
+    """Per-route call counts, latency percentiles, escalations and errors"""
+
+    def __init__(self, window=500):
+        self._lock = threading.Lock()
+        self._routes = defaultdict(lambda: {"routed": 0, "answered": 0, "errors": 0,
+                                            "latency_ms": deque(maxlen=window)})
+        self._escalations = Counter()
+
+    def record(self, route, latency_ms=None, answered=False, error=False, escalation=None):
+        with self._lock:
+            r = self._routes[route]
+            r["routed"] += 1
+            r["answered"] += answered
+            r["errors"] += error
+            if latency_ms is not None:
+                r["latency_ms"].append(latency_ms)
+            if escalation:
+                self._escalations[escalation] += 1
+
+    def snapshot(self):
+        """{route: counters plus p50/p95 latency}, and escalations by reason"""
+        with self._lock:
+            routes = {name: (dict(r), list(r["latency_ms"])) for name, r in self._routes.items()}
+            escalations = dict(self._escalations)
+        out = {}
+        for name, (r, samples) in routes.items():
+            p50, p95 = np.percentile(samples, [50, 95]) if samples else (0.0, 0.0)
+            out[name] = {"routed": r["routed"], "answered": r["answered"], "errors": r["errors"],
+                         "latency_ms_p50": float(p50), "latency_ms_p95": float(p95)}
+        return {"routes": out, "escalations": escalations}
+
+# ----------------------------- #
+# Routed Completion
+# ----------------------------- #
+def complete_routed(complete, route, stats=None, on_text=None):
+    """Answer text from complete(model, on_text) on route, escalating when needed
+
+    A small-model answer is not streamed: it arrives quickly and must pass
+    quality_problem() before being shown. When it fails, or the call
+    errors, the large model answers instead (streamed as usual). Running
+    out of quota or an open circuit is not escalated: the large model would
+    wait on the same limiter and breaker.
+    """
+    escalation = None
+    if route.name == "small":
+        start = time.perf_counter()
+        try:
+            answer = complete(route.model, None)
+        except (RateLimitTimeout, CircuitOpenError):
+            if stats is not None:
+                stats.record("small", error=True)
+            raise
+        except Exception as e:
+            escalation = f"error: {type(e).__name__}"
+            if stats is not None:
+                stats.record("small", error=True, escalation=escalation)
+        else:
+            latency_ms = (time.perf_counter() - start) * 1000
+            escalation = quality_problem(answer, route)
+            if stats is not None:
+                stats.record("small", latency_ms, answered=escalation is None,
+                             escalation=escalation)
+            if escalation is None:
+                return answer
+
+    start = time.perf_counter()
+    try:
+        answer = complete(LARGE_MODEL, on_text)
+    except Exception:
+        if stats is not None:
+            stats.record("large", error=True)
+        raise
+    if stats is not None:
+        stats.record("large", (time.perf_counter() - start) * 1000, answered=True)
+    return answer
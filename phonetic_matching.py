@@ -0,0 +1,101 @@
+import math
+import re
+from dataclasses import dataclass
+from types import MappingProxyType
+from bm25_matching import tokenize
+from service_matching import ServiceMatch, services_fingerprint
+
+# Keys shorter than this collide too often to be useful: "DOI" keys to "D"
+# and is dropped, while two-letter keys such as "HR" are kept
+MIN_KEY_LENGTH = 2
+
+# Spelling variants that sound alike, applied in order before vowels are dropped
+_SOUND_RULES = [
+    (r"ck", "k"), (r"ph", "f"), (r"gh", "g"), (r"sh", "s"), (r"th", "t"), (r"bh", "b"),
+    (r"dh", "d"), (r"kh", "k"), (r"wh", "w"), (r"ch", "C"), (r"c(?=[eiy])", "s"),
+    (r"c", "k"), (r"q", "k"), (r"x", "ks"), (r"z", "j"), (r"v", "b"),
+]
+
+# ----------------------------- #
+# Phonetic Keys
+# ----------------------------- #
+def phonetic_key(word):
+    """Consonant skeleton of a word, tolerant of vowel swaps and Banglish spellings
+
+    "turnitin" and "tarnitin" both become "TRNTN", "locker" and "lokar" "LKR".
+    """
+    word = re.sub(r"[^a-z]", "", word.lower())
+    if not word:
+        return ""
+    for pattern, replacement in _SOUND_RULES:
+        word = re.sub(pattern, replacement, word)
+    # Keep a leading vowel, drop the rest along with silent h
+    skeleton = word[0] + re.sub(r"[aeiouyh]", "", word[1:])
+    collapsed = re.sub(r"(.)\1+", r"\1", skeleton)
+    return collapsed.upper()
+
+
+def query_keys(text):
+    """Distinct phonetic keys of the content words in text"""
+    keys = (phonetic_key(w) for w in tokenize(text))
+    return list(dict.fromkeys(k for k in keys if len(k) >= MIN_KEY_LENGTH))
+
+# ----------------------------- #
+# Phonetic Index
+# ----------------------------- #
+@dataclass(frozen=True)
+class PhoneticIndex:
+    """Phonetic key of every word in service names, keywords and aliases"""
+    fingerprint: str
+    services: tuple
+    postings: MappingProxyType  # key -> services using a word with that key
+    weights: MappingProxyType   # key -> IDF across services
+    unknown_weight: float       # weight of a query key no service uses
+
+
+def build_phonetic_index(services, fingerprint=None):
+    """Precompute phonetic keys for every service"""
+    postings = {}
+    for service_name, service_data in services.items():
+        terms = [service_name] + list(service_data.get('keywords', [])) + \
+            list(service_data.get('aliases', []))
+        for key in query_keys(" ".join(terms)):
+            postings.setdefault(key, []).append(service_name)
+
+    count = max(len(services), 1)
+    weights = {key: math.log(1 + count / len(names)) for key, names in postings.items()}
+    return PhoneticIndex(
+        fingerprint=fingerprint or services_fingerprint(services),
+        services=tuple(services),
+        postings=MappingProxyType({k: tuple(v) for k, v in postings.items()}),
+        weights=MappingProxyType(weights),
+        unknown_weight=math.log(1 + count)
+    )
+
+
+def match_phonetic(index, query, score_cutoff=0):
+    """Service whose words sound like most of the query, as a ServiceMatch, or None
+
+    The score is the IDF-weighted share (0-100) of query words that sound
+    like a word of the service; words no service uses count against it.
+    """
+    keys = query_keys(query)
+    if not keys:
+        return None
+
+    covered, total = {}, 0.0
+    for key in keys:
+        weight = index.weights.get(key, index.unknown_weight)
+        total += weight
+        for service in index.postings.get(key, ()):
+            covered[service] = covered.get(service, 0.0) + weight
+    if not covered:
+        return None
+
+    best = max(covered.values())
+    score = round(100 * best / total, 1)
+    if score < score_cutoff:
+        return None
+    # Equally good services are all returned, in catalog order
+    services = tuple(s for s in index.services if covered.get(s, 0.0) >= best - 1e-9)
+    return ServiceMatch(services=services, term=query, score=score)
@@ -0,0 +1,95 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------- #
+# Request Pacing
+# ----------------------------- #
+class RateLimiter:
+    """Spaces calls at least 1/rate_per_s seconds apart across threads"""
+
+    def __init__(self, rate_per_s):
+        self.interval = 1.0 / rate_per_s if rate_per_s else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self):
+        """Block until this caller's slot comes up"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+# ----------------------------- #
+# Background Warm-up
+# ----------------------------- #
+class Prewarmer:
+    """Runs warm(key) for every key on a bounded pool in a background thread
+
+    warm(key) returns True when it did work and False when the key was
+    already warm; exceptions are logged and counted as failures. start()
+    returns immediately, and progress() can be polled from any thread.
+    """
+
+    def __init__(self, keys, warm, max_workers=4, rate_per_s=0.5, name="prewarm"):
+        self.keys = list(keys)
+        self.warm = warm
+        self.max_workers = max_workers
+        self.limiter = RateLimiter(rate_per_s)
+        self.name = name
+        self._lock = threading.Lock()
+        self._progress = {"total": len(self.keys), "warmed": 0, "skipped": 0, "failed": 0}
+        self._thread = None
+        self._started_at = self._finished_at = None
+
+    def start(self):
+        """Begin warming in a daemon thread; later calls are no-ops"""
+        with self._lock:
+            if self._thread is not None:
+                return self
+            self._started_at = time.monotonic()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        return self
+
+    def _warm_one(self, key):
+        self.limiter.acquire()
+        try:
+            outcome = "warmed" if self.warm(key) else "skipped"
+        except Exception as e:
+            logger.warning("%s: %r failed: %s", self.name, key, e)
+            outcome = "failed"
+        with self._lock:
+            self._progress[outcome] += 1
+            done = sum(self._progress[k] for k in ("warmed", "skipped", "failed"))
+        logger.info("%s: %d/%d done (%r %s)", self.name, done, len(self.keys), key, outcome)
+
+    def _run(self):
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix=self.name) as pool:
+            list(pool.map(self._warm_one, self.keys))
+        with self._lock:
+            self._finished_at = time.monotonic()
+            progress = dict(self._progress)
+        logger.info("%s finished in %.1f s: %s", self.name,
+                    self._finished_at - self._started_at, progress)
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def progress(self):
+        """Counters plus done, running and elapsed_s"""
+        with self._lock:
+            progress = dict(self._progress)
+            started, finished = self._started_at, self._finished_at
+        progress["done"] = progress["warmed"] + progress["skipped"] + progress["failed"]
+        progress["running"] = started is not None and finished is None
+        end = finished if finished is not None else time.monotonic()
+        progress["elapsed_s"] = end - started if started is not None else 0.0
+        return progress
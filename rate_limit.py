@@ -0,0 +1,181 @@
+import heapq
+import itertools
+import re
+import threading
+import time
+from collections import Counter
+
+# Lower numbers are served first
+PRIORITIES = {"chat": 0, "explanation": 1, "recommendations": 2, "prewarm": 3}
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_S = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+class RateLimitTimeout(TimeoutError):
+    """A request could not get a rate-limit slot within its timeout"""
+
+
+def parse_duration(value):
+    """Seconds in a Groq reset header ("2m59.56s", "7.66s", "120ms"), or None"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    return sum(float(n) * _UNIT_S[unit] for n, unit in parts) if parts else None
+
+# ----------------------------- #
+# Token Buckets
+# ----------------------------- #
+class TokenBucket:
+    """Capacity refilled continuously at refill_per_s; not thread-safe on its own"""
+
+    def __init__(self, capacity, refill_per_s):
+        self.capacity = float(capacity)
+        self.base_rate = self.rate = float(refill_per_s)
+        self.level = float(capacity)
+        self._updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def sync(self, limit, remaining, reset_s, now):
+        """Adopt the server's view: remaining now, back to limit after reset_s"""
+        self.refill(now)
+        if limit:
+            self.capacity = float(limit)
+        self.level = float(remaining)
+        deficit = self.capacity - self.level
+        self.rate = max(self.base_rate, deficit / reset_s) if reset_s else self.base_rate
+
+    def seconds_until(self, amount):
+        missing = min(amount, self.capacity) - self.level
+        return missing / self.rate if missing > 0 else 0.0
+
+# ----------------------------- #
+# Shared Limiter
+# ----------------------------- #
+class GroqRateLimiter:
+    """Request and token buckets shared by every Groq call in the process
+
+    acquire() queues callers by priority (FIFO within a priority) and admits
+    the head of the queue once both buckets can cover it. observe() feeds
+    back the x-ratelimit-* headers of each response, and a 429 pauses the
+    whole queue for its retry-after.
+    """
+
+    def __init__(self, requests_per_min=30, tokens_per_min=6000):
+        self.requests = TokenBucket(requests_per_min, requests_per_min / 60)
+        self.tokens = TokenBucket(tokens_per_min, tokens_per_min / 60)
+        self._cond = threading.Condition()
+        self._queue = []  # [priority, seq, tokens]
+        self._seq = itertools.count()
+        self._blocked_until = 0.0
+        self._stats = Counter()
+
+    def _refill(self, now):
+        self.requests.refill(now)
+        self.tokens.refill(now)
+
+    def _wait_s(self, now, requests, tokens):
+        return max(self._blocked_until - now,
+                   self.requests.seconds_until(requests),
+                   self.tokens.seconds_until(tokens), 0.0)
+
+    def _estimate(self, now, priority, tokens, seq=float("inf")):
+        """Wait for a request behind every queued entry that sorts before (priority, seq)"""
+        ahead = [e for e in self._queue if (e[0], e[1]) < (priority, seq)]
+        return self._wait_s(now, len(ahead) + 1, sum(e[2] for e in ahead) + tokens)
+
+    def estimate_wait(self, priority=0, tokens=1):
+        """Seconds a new request of this priority would wait right now"""
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            return self._estimate(now, priority, tokens)
+
+    def acquire(self, priority=0, tokens=1, timeout=None):
+        """Block until admitted; returns seconds waited
+
+        Raises RateLimitTimeout when the slot is not expected within timeout.
+        """
+        start = time.monotonic()
+        with self._cond:
+            entry = [priority, next(self._seq), tokens]
+            heapq.heappush(self._queue, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    wait_s = self._wait_s(now, 1, tokens)
+                    if self._queue[0] is entry and wait_s == 0:
+                        heapq.heappop(self._queue)
+                        self.requests.level -= 1
+                        self.tokens.level -= min(tokens, self.tokens.capacity)
+                        waited = now - start
+                        self._stats["admitted"] += 1
+                        self._stats["waited"] += waited > 0.001
+                        self._cond.notify_all()
+                        return waited
+                    if timeout is not None and \
+                            now - start + self._estimate(now, priority, tokens, entry[1]) > timeout:
+                        self._stats["timed_out"] += 1
+                        raise RateLimitTimeout(
+                            f"Groq rate limit: no slot within {timeout:.1f} s")
+                    # Woken early when the queue head changes or headers arrive
+                    self._cond.wait(max(wait_s, 0.01) if self._queue[0] is entry else 0.5)
+            except BaseException:
+                if entry in self._queue:
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+                raise
+
+    def release(self, tokens=1):
+        """Give back a slot taken by acquire() for a request that was never sent"""
+        with self._cond:
+            self._refill(time.monotonic())
+            self.requests.level = min(self.requests.capacity, self.requests.level + 1)
+            self.tokens.level = min(self.tokens.capacity,
+                                    self.tokens.level + min(tokens, self.tokens.capacity))
+            self._stats["released"] += 1
+            self._cond.notify_all()
+
+    def observe(self, headers, status_code=200):
+        """Update the buckets from a response's rate-limit headers"""
+        now = time.monotonic()
+        with self._cond:
+            for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                if remaining is None:
+                    continue
+                try:
+                    limit = float(headers.get(f"x-ratelimit-limit-{kind}") or 0)
+                    bucket.sync(limit, float(remaining),
+                                parse_duration(headers.get(f"x-ratelimit-reset-{kind}")), now)
+                except ValueError:
+                    continue
+            if status_code == 429:
+                self._stats["throttled"] += 1
+                retry_after = parse_duration(headers.get("retry-after")) or 1.0
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+            self._cond.notify_all()
+
+    def stats(self):
+        """Bucket levels, queue depth and admission counters"""
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            stats = {k: self._stats[k] for k in ("admitted", "waited", "timed_out", "throttled",
+                                                 "released")}
+            stats.update(
+                queued=len(self._queue),
+                requests_left=int(self.requests.level),
+                tokens_left=int(self.tokens.level),
+                paused_s=max(self._blocked_until - now, 0.0),
+            )
+        return stats
@@ -0,0 +1,184 @@
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+from bm25_matching import stem, tokenize
+from semantic_matching import EMBEDDING_DIM, embed
+from service_matching import query_cache_key
+
+# Words that point back into the conversation ("what about it?", "tell me
+# more"); a query using them is answered from context, not on its own
+FOLLOW_UP_WORDS = frozenset({
+    "it", "its", "that", "this", "these", "those", "they", "them", "their", "there",
+    "he", "she", "him", "her", "his", "one", "ones", "more", "else", "also", "again",
+    "another", "previous", "above", "same", "instead", "then",
+})
+EVICTION_POLICIES = ("lru", "lfu")
+
+# Word forms folded together (after stemming) so paraphrases share words
+SYNONYMS = {
+    "hour": "time", "timing": "time", "clos": "close", "closed": "close",
+    "renewal": "renew", "citation": "cite", "overdue": "late", "penalty": "fine",
+    "allowed": "allow",
+}
+# Framing words that do not change what is asked ("explain X", "tips for X")
+FILLER_WORDS = frozenset({"explain", "tip", "suggest", "tell", "there", "much", "know", "want",
+                          "need", "location"})
+# Two queries must agree on all of these to share an answer: numbers,
+# negations and days differ in meaning far more than in spelling
+DISTINCTIVE_WORDS = frozenset({
+    "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+    "first", "second", "third", "last", "next",
+    "no", "not", "never", "without", "cannot", "t",
+    "today", "tomorrow", "tonight", "yesterday", "weekend", "weekday", "holiday",
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+})
+
+# ----------------------------- #
+# Cache Keys
+# ----------------------------- #
+def cache_key(query):
+    """query_cache_key with words stemmed, synonyms folded and framing words dropped"""
+    words = [SYNONYMS.get(w, w) for w in map(stem, query_cache_key(query).split())]
+    return " ".join(w for w in words if w not in FILLER_WORDS)
+
+
+def distinctive_tokens(key):
+    """Numbers and DISTINCTIVE_WORDS in a cache key"""
+    return frozenset(w for w in key.split()
+                     if w in DISTINCTIVE_WORDS or any(c.isdigit() for c in w))
+
+# ----------------------------- #
+# Context Rule
+# ----------------------------- #
+def depends_on_context(query, history):
+    """True when earlier turns of history could change the answer to query
+
+    history is the chat so far, possibly ending with query itself. Only a
+    conversation with an earlier assistant answer can supply context, and
+    only follow-up phrasing or a query too short to stand alone uses it.
+    """
+    earlier = history[:-1] if history and history[-1].get("content") == query else history
+    if not any(m.get("role") == "assistant" for m in earlier):
+        return False
+    words = set(query.casefold().replace("?", " ").split())
+    return bool(words & FOLLOW_UP_WORDS) or len(tokenize(query)) < 2
+
+# ----------------------------- #
+# Semantic Response Cache
+# ----------------------------- #
+class SemanticResponseCache:
+    """Bounded TTL cache of LLM answers, looked up by query embedding similarity
+
+    Queries are normalized with cache_key and embedded with the local
+    encoder; a lookup returns the answer of the most similar live entry when
+    its cosine similarity reaches the threshold and both queries have the
+    same distinctive_tokens (numbers, negations, days). Entries are evicted
+    by LRU or LFU (ties broken by recency) once maxsize is reached, expired
+    ones first.
+    """
+
+    def __init__(self, bucket_weights, maxsize=512, ttl_s=6 * 3600, threshold=0.8,
+                 eviction="lru"):
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f"eviction must be one of {EVICTION_POLICIES}, not {eviction!r}")
+        self.bucket_weights = bucket_weights
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self.threshold = threshold
+        self.eviction = eviction
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((maxsize, EMBEDDING_DIM), dtype=np.float32)
+        self._expires = np.full(maxsize, -np.inf)  # -inf marks a free slot
+        self._slots = {}  # normalized query -> slot
+        self._entries = [None] * maxsize  # slot -> {"key", "answer", "hits", "used"}
+        self._tick = 0
+        self._stats = Counter()
+
+    def _embed(self, key):
+        return embed([key], self.bucket_weights)[0]
+
+    def _touch(self, slot):
+        self._tick += 1
+        entry = self._entries[slot]
+        entry["hits"] += 1
+        entry["used"] = self._tick
+        return entry["answer"]
+
+    def get(self, query):
+        """Cached answer for query or a near-duplicate of it, or None"""
+        key = cache_key(query)
+        if not key:
+            return None  # nothing left to compare once stopwords are dropped
+        vector = None if key in self._slots else self._embed(key)
+        now = time.monotonic()
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is not None and self._expires[slot] > now:
+                self._stats["exact_hits"] += 1
+                return self._touch(slot)
+            if vector is None:
+                vector = self._embed(key)
+            similarities = self._vectors @ vector
+            similarities[self._expires <= now] = -np.inf
+            marks = distinctive_tokens(key)
+            for slot in np.flatnonzero(similarities >= self.threshold):
+                if distinctive_tokens(self._entries[slot]["key"]) != marks:
+                    similarities[slot] = -np.inf
+            slot = int(np.argmax(similarities))
+            if similarities[slot] >= self.threshold:
+                self._stats["similar_hits"] += 1
+                return self._touch(slot)
+            self._stats["misses"] += 1
+            return None
+
+    def _victim(self, now):
+        expired = np.flatnonzero(self._expires <= now)
+        if len(expired):
+            return int(expired[0])
+        if self.eviction == "lfu":
+            rank = lambda s: (self._entries[s]["hits"], self._entries[s]["used"])
+        else:
+            rank = lambda s: self._entries[s]["used"]
+        self._stats["evictions"] += 1
+        return min(range(self.maxsize), key=rank)
+
+    def put(self, query, answer):
+        """Store answer for query, replacing the entry for the same normalized query"""
+        key = cache_key(query)
+        if not key:
+            return
+        vector = self._embed(key)
+        now = time.monotonic()
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._victim(now)
+                old = self._entries[slot]
+                if old is not None:
+                    self._slots.pop(old["key"], None)
+            self._tick += 1
+            self._entries[slot] = {"key": key, "answer": answer, "hits": 0, "used": self._tick}
+            self._slots[key] = slot
+            self._vectors[slot] = vector
+            self._expires[slot] = now + self.ttl_s
+
+    def record_bypass(self):
+        with self._lock:
+            self._stats["bypassed"] += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._slots.clear()
+            self._entries = [None] * self.maxsize
+            self._expires[:] = -np.inf
+
+    def stats(self):
+        with self._lock:
+            live = int(np.count_nonzero(self._expires > time.monotonic()))
+            stats = {k: self._stats[k] for k in
+                     ("exact_hits", "similar_hits", "misses", "bypassed", "evictions")}
+        stats["hits"] = stats["exact_hits"] + stats["similar_hits"]
+        stats["size"] = live
+        return stats
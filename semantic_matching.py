@@ -0,0 +1,117 @@
+import zlib
+import numpy as np
+from dataclasses import dataclass
+from bm25_matching import tokenize
+from service_matching import ServiceMatch, services_fingerprint
+
+# Encoder parameters; changing any of them changes every cached embedding
+NGRAM_SIZES = (3, 4)
+HASH_BUCKETS = 4096
+EMBEDDING_DIM = 256
+PROJECTION_SEED = 20240
+ENCODER_VERSION = f"hashed-ngrams-idf-v1-{NGRAM_SIZES}-{HASH_BUCKETS}-{EMBEDDING_DIM}-{PROJECTION_SEED}"
+
+# ----------------------------- #
+# Local Encoder
+# ----------------------------- #
+_projection = None
+
+def projection_matrix():
+    """Fixed Gaussian random projection from hashed n-grams to embeddings"""
+    global _projection
+    if _projection is None:
+        rng = np.random.default_rng(PROJECTION_SEED)
+        _projection = (rng.standard_normal((HASH_BUCKETS, EMBEDDING_DIM))
+                       / np.sqrt(EMBEDDING_DIM)).astype(np.float32)
+    return _projection
+
+
+def hashed_features(text):
+    """Signed feature-hashed bag of words and character n-grams"""
+    features = np.zeros(HASH_BUCKETS, dtype=np.float32)
+    for word in tokenize(text):
+        grams = [f"w:{word}"]
+        padded = f" {word} "
+        for n in NGRAM_SIZES:
+            grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        for gram in grams:
+            # crc32 is stable across processes, unlike hash()
+            h = zlib.crc32(gram.encode("utf-8"))
+            features[h % HASH_BUCKETS] += 1.0 if (h >> 16) & 1 else -1.0
+    return features
+
+
+def feature_matrix(texts):
+    """(texts x HASH_BUCKETS) hashed features"""
+    if not texts:
+        return np.zeros((0, HASH_BUCKETS), dtype=np.float32)
+    return np.stack([hashed_features(t) for t in texts])
+
+
+def embed(texts, bucket_weights):
+    """L2-normalized embeddings of texts, one row each"""
+    vectors = (feature_matrix(texts) * bucket_weights) @ projection_matrix()
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+# ----------------------------- #
+# Service Embedding Matrix
+# ----------------------------- #
+@dataclass(frozen=True)
+class SemanticIndex:
+    """Embeddings of each service's name, keywords and info, one row per text"""
+    fingerprint: str
+    services: tuple
+    row_starts: np.ndarray      # first row of each service in embeddings
+    bucket_weights: np.ndarray  # IDF of each hash bucket over the service texts
+    embeddings: np.ndarray      # (rows x EMBEDDING_DIM), L2-normalized
+
+
+def service_texts(service_name, service_data):
+    """Texts embedded for one service"""
+    texts = [service_name] + list(service_data.get('keywords', []))
+    if service_data.get('info'):
+        texts.append(service_data['info'])
+    return texts
+
+
+def build_semantic_index(services, fingerprint=None):
+    """Embed every service description into a SemanticIndex"""
+    names, texts, row_starts = tuple(services), [], []
+    for service_name in names:
+        row_starts.append(len(texts))
+        texts.extend(service_texts(service_name, services[service_name]))
+
+    # Down-weight n-grams shared by many services ("lib", "book") so the
+    # distinctive parts of a description dominate the similarity
+    doc_freq = np.count_nonzero(feature_matrix(texts), axis=0)
+    bucket_weights = (np.log((1 + len(texts)) / (1 + doc_freq)) + 1).astype(np.float32)
+    return SemanticIndex(
+        fingerprint=fingerprint or services_fingerprint(services),
+        services=names,
+        row_starts=np.asarray(row_starts, dtype=np.int64),
+        bucket_weights=bucket_weights,
+        embeddings=embed(texts, bucket_weights)
+    )
+
+# ----------------------------- #
+# Matching
+# ----------------------------- #
+def semantic_scores(index, query):
+    """Cosine similarity (0-100) of query to every service's closest text"""
+    if not len(index.services):
+        return np.zeros(0, dtype=np.float32)
+    similarities = index.embeddings @ embed([query], index.bucket_weights)[0]
+    return 100 * np.maximum.reduceat(similarities, index.row_starts)
+
+
+def match_semantic(index, query, score_cutoff=0):
+    """Best service for query by embedding similarity, as a ServiceMatch, or None"""
+    scores = semantic_scores(index, query)
+    if not len(scores):
+        return None
+    best = int(np.argmax(scores))
+    if scores[best] <= 0 or scores[best] < score_cutoff:
+        return None
+    return ServiceMatch(services=(index.services[best],), term=query,
+                        score=round(float(scores[best]), 1))
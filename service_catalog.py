@@ -0,0 +1,122 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+from dataclasses import dataclass
+from bm25_matching import build_bm25_index
+from phonetic_matching import build_phonetic_index
+from semantic_matching import ENCODER_VERSION, build_semantic_index, projection_matrix
+from service_matching import build_service_index, services_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Bump when any compiled index changes shape so stale caches are ignored
+CATALOG_CACHE_VERSION = f"2:{ENCODER_VERSION}"
+CACHE_DIR = os.getenv(
+    "CATALOG_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+)
+
+# ----------------------------- #
+# Compiled Service Catalog
+# ----------------------------- #
+@dataclass(frozen=True)
+class ServiceCatalog:
+    """library_services plus every matching index derived from it"""
+    path: str
+    mtime_ns: int
+    file_hash: str
+    services: dict
+    service_index: object
+    bm25_index: object
+    semantic_index: object
+    phonetic_index: object
+
+
+def compile_catalog(services):
+    """Build all matching indexes for a services mapping"""
+    fingerprint = services_fingerprint(services)
+    return {
+        "services": services,
+        "service_index": build_service_index(services, fingerprint),
+        "bm25_index": build_bm25_index(services, fingerprint),
+        "semantic_index": build_semantic_index(services, fingerprint),
+        "phonetic_index": build_phonetic_index(services, fingerprint),
+    }
+
+
+def _cache_path(file_hash):
+    key = hashlib.sha1(f"{file_hash}:{CATALOG_CACHE_VERSION}".encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, f"catalog-{key}.pickle")
+
+
+def _load_compiled(file_hash, raw):
+    """Compiled catalog from the binary cache, compiling and caching it on a miss"""
+    path = _cache_path(file_hash)
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        pass
+
+    compiled = compile_catalog(json.loads(raw))
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(compiled, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except (OSError, pickle.PicklingError) as e:
+        logger.warning("Could not cache compiled service catalog: %s", e)
+    return compiled
+
+
+def load_service_catalog(path):
+    """Read a services data file and return its compiled ServiceCatalog"""
+    mtime_ns = os.stat(path).st_mtime_ns
+    with open(path, "rb") as f:
+        raw = f.read()
+    file_hash = hashlib.sha1(raw).hexdigest()
+    projection_matrix()  # generated here so the first query doesn't pay for it
+    return ServiceCatalog(path=path, mtime_ns=mtime_ns, file_hash=file_hash,
+                          **_load_compiled(file_hash, raw))
+
+
+_catalogs = {}
+_failed_mtimes = {}  # path -> mtime of an edit that failed to load
+_reload_lock = threading.Lock()
+
+def get_service_catalog(path):
+    """Current catalog for path, reloaded atomically when the file's mtime changes
+
+    A broken edit (invalid JSON) is logged and the previous catalog keeps
+    serving, so running sessions are never left without services.
+    """
+    catalog = _catalogs.get(path)
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        if catalog is None:
+            raise
+        return catalog
+    if catalog is not None and mtime_ns in (catalog.mtime_ns, _failed_mtimes.get(path)):
+        return catalog
+
+    with _reload_lock:
+        catalog = _catalogs.get(path)
+        if catalog is not None and catalog.mtime_ns == mtime_ns:
+            return catalog
+        try:
+            fresh = load_service_catalog(path)
+        except (OSError, ValueError) as e:
+            if catalog is None:
+                raise
+            logger.error("Keeping previous service catalog; reload of %s failed: %s", path, e)
+            _failed_mtimes[path] = mtime_ns
+            return catalog
+        if catalog is not None:
+            logger.info("Reloaded service catalog from %s", path)
+        _catalogs[path] = fresh
+        return fresh
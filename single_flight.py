@@ -0,0 +1,127 @@
+import json
+import threading
+from collections import Counter
+
+# ----------------------------- #
+# Single-flight Coalescing
+# ----------------------------- #
+class _Flight:
+    """One in-flight call and the callers waiting on it"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.text = None      # latest streamed text, for waiters that render it
+        self.done = False
+        self.result = None
+        self.error = None
+        self.abandoned = False  # the leader was interrupted; a waiter takes over
+        self.waiters = 0
+
+
+_ABANDONED = object()
+
+
+class SingleFlight:
+    """Process-wide coalescing of identical concurrent calls
+
+    The first caller for a key (the leader) runs the call; callers arriving
+    while it is in flight wait and share its result or exception. Streamed
+    text published by the leader is relayed to each waiter's own on_text
+    from the waiter's thread. Only Exception subclasses are shared: when the
+    leader is interrupted by a BaseException (a Streamlit rerun or stop in
+    its own session), the waiters wake and one of them leads a new call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._stats = Counter()
+
+    def do(self, key, fn, on_text=None):
+        """Result of fn(publish) for key, shared with identical concurrent calls
+
+        fn receives a publish(text) callback for streamed text, or None
+        when the leader does not stream.
+        """
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+                    self._stats["leaders"] += 1
+                else:
+                    self._stats["coalesced"] += 1
+                    flight.waiters += 1
+                    self._stats["max_waiters"] = max(self._stats["max_waiters"], flight.waiters)
+            if leader:
+                return self._lead(key, flight, fn, on_text)
+            result = self._wait(flight, on_text)
+            if result is not _ABANDONED:
+                return result
+
+    def in_flight(self, key):
+        """Whether a call for key is in flight now (it may finish at any moment)"""
+        with self._lock:
+            return key in self._flights
+
+    def _lead(self, key, flight, fn, on_text):
+        def publish(text):
+            with flight.cond:
+                flight.text = text
+                flight.cond.notify_all()
+            on_text(text)
+
+        try:
+            flight.result = fn(publish if on_text else None)
+        except Exception as e:
+            flight.error = e
+            raise
+        except BaseException:
+            flight.abandoned = True  # this session's control flow, not the call's outcome
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.error is not None and flight.waiters:
+                    self._stats["shared_errors"] += flight.waiters
+                if flight.abandoned:
+                    self._stats["abandoned"] += 1
+            with flight.cond:
+                flight.done = True
+                flight.cond.notify_all()
+        return flight.result
+
+    def _wait(self, flight, on_text):
+        shown = None
+        while True:
+            with flight.cond:
+                while not flight.done and flight.text is shown:
+                    flight.cond.wait()
+                text, done = flight.text, flight.done
+            # Drawn outside the lock so a slow renderer never stalls the leader
+            if text is not shown:
+                shown = text
+                if on_text and text is not None:
+                    on_text(text)
+            if done:
+                break
+        if flight.abandoned:
+            return _ABANDONED
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def stats(self):
+        """leaders (calls made), coalesced (calls saved), shared_errors, abandoned, in_flight"""
+        with self._lock:
+            stats = {k: self._stats[k] for k in
+                     ("leaders", "coalesced", "shared_errors", "abandoned", "max_waiters")}
+            stats["in_flight"] = len(self._flights)
+        return stats
+
+
+def request_key(**create_kwargs):
+    """Coalescing key of a chat completion: model, messages and sampling settings"""
+    relevant = {k: v for k, v in create_kwargs.items() if k not in ("timeout", "stream")}
+    return json.dumps(relevant, sort_keys=True, default=str)
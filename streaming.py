@@ -0,0 +1,226 @@
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import wait
+
+import numpy as np
+from chat_context import count_tokens
+from hedging import CompletionCancelled
+from single_flight import request_key
+
+logger = logging.getLogger(__name__)
+
+# Completion length assumed for rate limiting when a request sets no max_tokens
+DEFAULT_COMPLETION_TOKENS = 400
+
+# ----------------------------- #
+# Per-call Latency
+# ----------------------------- #
+class CompletionStats:
+    """Process-wide time-to-first-token and total time per kind of LLM call"""
+
+    def __init__(self, window=500):
+        self._lock = threading.Lock()
+        self._calls = defaultdict(lambda: {"calls": 0, "errors": 0, "streamed": 0,
+                                           "ttft_ms": deque(maxlen=window),
+                                           "total_ms": deque(maxlen=window)})
+
+    def record(self, label, ttft_ms, total_ms, streamed, ok=True):
+        with self._lock:
+            c = self._calls[label]
+            c["calls"] += 1
+            c["streamed"] += streamed
+            if not ok:
+                c["errors"] += 1
+                return
+            c["ttft_ms"].append(ttft_ms)
+            c["total_ms"].append(total_ms)
+
+    def snapshot(self):
+        """{label: counters plus p50/p95 ttft_ms and total_ms over the recent window}"""
+        with self._lock:
+            calls = {label: (dict(c), list(c["ttft_ms"]), list(c["total_ms"]))
+                     for label, c in self._calls.items()}
+        out = {}
+        for label, (c, ttft, total) in calls.items():
+            row = {k: c[k] for k in ("calls", "errors", "streamed")}
+            for name, samples in (("ttft_ms", ttft), ("total_ms", total)):
+                p50, p95 = np.percentile(samples, [50, 95]) if samples else (0.0, 0.0)
+                row[f"{name}_p50"], row[f"{name}_p95"] = float(p50), float(p95)
+            out[label] = row
+        return out
+
+# ----------------------------- #
+# Completions
+# ----------------------------- #
+def chat_completion(client, label="chat", on_text=None, stats=None, flights=None,
+                    limiter=None, priority=0, max_wait_s=None, breaker=None, is_failure=None,
+                    hedger=None, cancel=None, slot_held=False, **create_kwargs):
+    """Run a Groq chat completion and return its full text
+
+    With on_text, the completion is streamed and on_text(text_so_far) is
+    called as tokens arrive; otherwise it is a single blocking call. Either
+    way the time to first token and total time are logged and recorded in
+    stats. API errors propagate after being recorded.
+
+    With flights (a SingleFlight), a request identical to one already in
+    flight joins it instead of being sent again. With limiter (a
+    GroqRateLimiter), a request waits for a slot at its own priority, for
+    at most max_wait_s, before it is sent or starts a flight, so joining a
+    flight never means waiting behind a lower-priority leader; slot_held
+    says the caller already has one. With breaker (a CircuitBreaker), the
+    call fails fast while the circuit is open; errors for which
+    is_failure(error) is true (default: all) and streamed first tokens
+    slower than the breaker's SLO count against the circuit. Blocking calls
+    are not judged by latency, as their time includes the SDK's retries.
+
+    With hedger (a Hedger), the request is streamed internally and sent a
+    second time when its first token is late; the hedge never waits for a
+    rate-limit slot. cancel (a Cancellation) stops an attempt that lost.
+    """
+    if flights is not None:
+        key = request_key(**create_kwargs)
+        slot = []  # tokens of a slot taken here and not yet used by a leader
+        if limiter is not None and not flights.in_flight(key):
+            tokens = estimate_tokens(**create_kwargs)
+            limiter.acquire(priority, tokens, timeout=max_wait_s)
+            slot.append(tokens)
+
+        def lead(publish):
+            held = bool(slot)
+            slot.clear()
+            return chat_completion(client, label, publish, stats, limiter=limiter,
+                                   priority=priority, max_wait_s=max_wait_s, breaker=breaker,
+                                   is_failure=is_failure, hedger=hedger, slot_held=held,
+                                   **create_kwargs)
+
+        try:
+            return flights.do(key, lead, on_text)
+        finally:
+            if slot:  # joined a flight that started while this caller waited
+                limiter.release(slot[0])
+    if hedger is not None:
+        return hedger.run(
+            lambda on_text, cancel, hedge: chat_completion(
+                client, label, on_text, stats, limiter=limiter, priority=priority,
+                max_wait_s=0 if hedge else max_wait_s, breaker=breaker,
+                is_failure=is_failure, cancel=cancel, slot_held=slot_held and not hedge,
+                **create_kwargs),
+            key=f"{label}:{create_kwargs.get('model')}", on_text=on_text
+        )
+    if breaker is not None:
+        try:
+            breaker.before_call()
+        except BaseException:
+            if slot_held:
+                limiter.release(estimate_tokens(**create_kwargs))
+            raise
+    if limiter is not None and not slot_held:
+        try:
+            limiter.acquire(priority, estimate_tokens(**create_kwargs), timeout=max_wait_s)
+        except BaseException:
+            if breaker is not None:
+                breaker.cancel()
+            raise
+    streamed = on_text is not None
+    start = time.perf_counter()
+    ttft_ms = None
+    try:
+        if streamed:
+            parts = []
+            response = client.chat.completions.create(stream=True, **create_kwargs)
+            if cancel is not None and hasattr(response, "close"):
+                cancel.on_cancel(response.close)  # unblocks a stalled read
+            for chunk in response:
+                if cancel is not None and cancel.is_set():
+                    raise CompletionCancelled()
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - start) * 1000
+                parts.append(delta)
+                on_text("".join(parts))
+            text = "".join(parts)
+        else:
+            response = client.chat.completions.create(**create_kwargs)
+            text = response.choices[0].message.content
+    except Exception as e:
+        if cancel is not None and cancel.is_set():
+            if breaker is not None:
+                breaker.cancel()
+            raise CompletionCancelled() from e
+        if stats is not None:
+            stats.record(label, None, None, streamed, ok=False)
+        if breaker is not None:
+            if is_failure is None or is_failure(e):
+                breaker.record_failure(e)
+            else:  # the API answered, just not with a completion
+                breaker.record_success()
+        raise
+    except BaseException:
+        # Interrupted (e.g. a Streamlit rerun inside on_text): no verdict on
+        # the upstream, but a half-open probe must be given back
+        if breaker is not None:
+            breaker.cancel()
+        raise
+
+    total_ms = (time.perf_counter() - start) * 1000
+    if breaker is not None:
+        breaker.record_success(ttft_ms)  # None unless a token was streamed
+    if ttft_ms is None:
+        ttft_ms = total_ms  # non-streamed, or the stream carried no text
+    logger.info("LLM %s: first token %.0f ms, total %.0f ms%s",
+                label, ttft_ms, total_ms, " (streamed)" if streamed else "")
+    if stats is not None:
+        stats.record(label, ttft_ms, total_ms, streamed)
+    return text
+
+
+def estimate_tokens(messages=(), max_tokens=None, **_):
+    """Prompt plus expected completion tokens of a request, for rate limiting"""
+    prompt = sum(count_tokens(m.get("content") or "") + 4 for m in messages)
+    return prompt + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+
+
+def throttled(on_text, interval_s=0.05):
+    """Wrap on_text so bursts of tokens redraw at most every interval_s
+
+    Intermediate texts may be dropped; callers draw the final text themselves.
+    """
+    last = [0.0]
+
+    def update(text):
+        now = time.perf_counter()
+        if now - last[0] >= interval_s:
+            last[0] = now
+            on_text(text)
+
+    return update
+
+
+def await_streamed(pool, fn, on_text=None, timeout_s=None, poll_s=0.05):
+    """Run fn(on_text=...) on pool and wait for its result in the calling thread
+
+    Text streamed by fn is relayed to on_text from the calling thread, which
+    is the only thread allowed to draw Streamlit elements. Raises
+    TimeoutError after timeout_s; fn keeps running in the background.
+    """
+    latest = [None]
+
+    def collect(text):
+        latest[0] = text
+
+    future = pool.submit(fn, on_text=collect if on_text else None)
+    deadline = time.monotonic() + timeout_s if timeout_s else None
+    shown = None
+    while True:
+        done, _ = wait([future], timeout=poll_s)
+        if on_text and latest[0] is not shown:
+            shown = latest[0]
+            on_text(shown)
+        if done:
+            return future.result()
+        if deadline is not None and time.monotonic() > deadline:
+            raise TimeoutError(f"no result after {timeout_s:.1f} s")
@@ -0,0 +1,23 @@
+import pandas as pd
+
+from book_recommendations import build_book_index, parse_interest, recommend
+
+
+def catalog():
+    return pd.DataFrame([
+        ("Introduction to Algorithms", "Cormen", "Algorithms", "Intermediate", "A1"),
+        ("Data Science from Scratch", "Grus", "Data Science", "Beginner", "D1"),
+        ("Cosmos", "Sagan", "Science", "All", "S1"),
+    ], columns=["Title", "Author", "Genre", "Skill_Level", "Location"])
+
+
+def test_longer_phrase_claims_its_words():
+    assert parse_interest("data structures in c").genres == ("Algorithms",)
+    assert parse_interest("data science").genres == ("Data Science",)
+    assert parse_interest("computer science basics").genres == ("Computer Science",)
+
+
+def test_data_structures_ranks_algorithms_first():
+    index = build_book_index(catalog())
+    found = recommend(index, parse_interest("data structures in c"))
+    assert found[0].title == "Introduction to Algorithms"
@@ -0,0 +1,96 @@
+from types import SimpleNamespace
+
+import pytest
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from streaming import chat_completion
+
+
+class Rerun(BaseException):
+    """Stands in for Streamlit's RerunException/StopException"""
+
+
+def open_breaker(**kwargs):
+    breaker = CircuitBreaker(failure_threshold=2, **kwargs)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure(ConnectionError())
+    return breaker
+
+
+def half_open_breaker():
+    breaker = open_breaker(open_s=0)
+    assert breaker.stats()["state"] == "half_open"
+    return breaker
+
+
+def streaming_client(*deltas):
+    def create(stream=False, **_):
+        return iter(SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=d))])
+                    for d in deltas)
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def test_consecutive_failures_open_the_circuit():
+    breaker = CircuitBreaker(failure_threshold=2, open_s=60)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.allows_calls()
+    breaker = open_breaker(open_s=60)
+    assert not breaker.allows_calls()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.stats()["state"] == "closed"
+
+
+def test_slow_first_token_counts_as_failure():
+    breaker = CircuitBreaker(failure_threshold=1, slow_call_ms=100)
+    breaker.record_success()  # no first-token time: never slow
+    assert breaker.stats()["state"] == "closed"
+    breaker.record_success(500)
+    assert breaker.stats()["state"] == "open"
+
+
+def test_half_open_probe_closes_or_reopens():
+    breaker = half_open_breaker()
+    breaker.before_call()
+    assert not breaker.allows_calls()  # the one probe is taken
+    breaker.record_success()
+    assert breaker.stats()["state"] == "closed"
+
+    breaker = half_open_breaker()
+    breaker.open_s = 60
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.stats()["state"] == "open"
+
+
+def test_cancelled_probe_is_given_back():
+    breaker = half_open_breaker()
+    breaker.before_call()
+    breaker.cancel()
+    assert breaker.allows_calls()
+
+
+def test_interrupted_streamed_call_releases_the_probe():
+    breaker = half_open_breaker()
+
+    def on_text(text):
+        raise Rerun()
+
+    with pytest.raises(Rerun):
+        chat_completion(streaming_client("hel", "lo"), on_text=on_text, breaker=breaker,
+                        model="m", messages=[])
+    assert breaker.stats()["state"] == "half_open"
+    assert breaker.allows_calls()
+    assert chat_completion(streaming_client("hel", "lo"), on_text=lambda text: None,
+                           breaker=breaker, model="m", messages=[]) == "hello"
+    assert breaker.stats()["state"] == "closed"
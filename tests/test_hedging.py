@@ -0,0 +1,51 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from hedging import CompletionCancelled, Hedger
+
+
+def streaming_attempt(ttft_s, text="answer"):
+    """attempt() that streams text after ttft_s, stopping early once cancelled"""
+    def attempt(on_text, cancel, hedge):
+        deadline = time.monotonic() + ttft_s
+        while time.monotonic() < deadline:
+            if cancel.is_set():
+                raise CompletionCancelled()
+            time.sleep(0.005)
+        on_text(text)
+        return text
+    return attempt
+
+
+@pytest.fixture
+def pool():
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        yield pool
+
+
+def test_slow_first_token_is_hedged(pool):
+    hedger = Hedger(pool, default_delay_ms=50)
+    calls = []
+
+    def attempt(on_text, cancel, hedge):
+        calls.append(hedge)
+        return streaming_attempt(0.01 if hedge else 2)(on_text, cancel, hedge)
+
+    assert hedger.run(attempt) == "answer"
+    assert calls == [False, True]
+    assert hedger.stats()["hedge_wins"] == 1
+
+
+def test_time_queued_in_the_pool_is_not_counted(pool):
+    hedger = Hedger(pool, default_delay_ms=100, min_delay_ms=0, min_samples=1)
+    release = threading.Event()
+    busy = [pool.submit(release.wait, 5) for _ in range(2)]
+    threading.Timer(0.3, release.set).start()
+    assert hedger.run(streaming_attempt(0.01)) == "answer"
+    for future in busy:
+        future.result()
+    assert hedger.stats()["hedged"] == 0
+    assert hedger.delay_ms("") < 100  # the recorded first-token time
@@ -0,0 +1,38 @@
+import pytest
+
+from circuit_breaker import CircuitOpenError
+from model_routing import LARGE_MODEL, SMALL_MODEL, Route, RoutingStats, complete_routed
+from rate_limit import RateLimitTimeout
+
+GOOD_ANSWER = "The library opens at 8 am and closes at 8 pm on weekdays."
+
+
+def failing_small(error):
+    calls = []
+
+    def complete(model, on_text):
+        calls.append(model)
+        if model == SMALL_MODEL:
+            raise error
+        return GOOD_ANSWER
+    return complete, calls
+
+
+def test_api_error_escalates_to_the_large_model():
+    complete, calls = failing_small(ValueError("bad gateway"))
+    stats = RoutingStats()
+    assert complete_routed(complete, Route("small", "short lookup"), stats) == GOOD_ANSWER
+    assert calls == [SMALL_MODEL, LARGE_MODEL]
+    assert stats.snapshot()["escalations"] == {"error: ValueError": 1}
+
+
+@pytest.mark.parametrize("error", [RateLimitTimeout("no slot"), CircuitOpenError(30)])
+def test_capacity_and_breaker_errors_are_not_escalated(error):
+    complete, calls = failing_small(error)
+    stats = RoutingStats()
+    with pytest.raises(type(error)):
+        complete_routed(complete, Route("small", "short lookup"), stats)
+    assert calls == [SMALL_MODEL]
+    snapshot = stats.snapshot()
+    assert snapshot["escalations"] == {}
+    assert snapshot["routes"]["small"]["errors"] == 1
@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+
+from rate_limit import GroqRateLimiter, RateLimitTimeout, parse_duration
+
+
+def drained_limiter():
+    """10 tokens/s refill and no tokens left"""
+    limiter = GroqRateLimiter(requests_per_min=600, tokens_per_min=600)
+    limiter.tokens.level = 0
+    return limiter
+
+
+def wait_until_queued(limiter, thread):
+    while thread.is_alive() and not limiter.stats()["queued"]:
+        time.sleep(0.001)
+
+
+def test_estimate_counts_the_request_once():
+    limiter = drained_limiter()
+    assert limiter.estimate_wait(0, 60) == pytest.approx(6.0, abs=0.05)
+
+
+def test_acquire_waits_when_slot_is_due_within_timeout():
+    limiter = drained_limiter()
+    waited = limiter.acquire(0, 3, timeout=0.5)
+    assert 0.25 < waited < 0.5
+    assert limiter.stats()["timed_out"] == 0
+
+
+def test_acquire_times_out_early_when_slot_is_not_due():
+    limiter = drained_limiter()
+    start = time.monotonic()
+    with pytest.raises(RateLimitTimeout):
+        limiter.acquire(0, 60, timeout=1)
+    assert time.monotonic() - start < 0.1
+    assert limiter.stats()["queued"] == 0
+
+
+def test_later_waiter_of_same_priority_does_not_delay_earlier_one():
+    limiter = drained_limiter()
+    results = {}
+
+    def acquire(name, tokens, timeout):
+        try:
+            results[name] = limiter.acquire(0, tokens, timeout=timeout)
+        except RateLimitTimeout as e:
+            results[name] = e
+
+    first = threading.Thread(target=acquire, args=("first", 3, 0.5))
+    first.start()
+    wait_until_queued(limiter, first)
+    later = threading.Thread(target=acquire, args=("later", 6, 2))
+    later.start()
+    first.join()
+    later.join()
+    assert not isinstance(results["first"], Exception)
+    assert not isinstance(results["later"], Exception)
+    assert limiter.stats()["admitted"] == 2
+
+
+def test_higher_priority_is_admitted_first():
+    limiter = drained_limiter()
+    order = []
+
+    def acquire(priority):
+        limiter.acquire(priority, 2)
+        order.append(priority)
+
+    low = threading.Thread(target=acquire, args=(3,))
+    low.start()
+    wait_until_queued(limiter, low)
+    high = threading.Thread(target=acquire, args=(0,))
+    high.start()
+    low.join()
+    high.join()
+    assert order == [0, 3]
+
+
+def test_release_returns_the_slot():
+    limiter = GroqRateLimiter(requests_per_min=600, tokens_per_min=600)
+    limiter.acquire(0, 600)
+    assert limiter.estimate_wait(0, 600) > 50
+    limiter.release(600)
+    assert limiter.estimate_wait(0, 600) == 0
+    assert limiter.stats()["released"] == 1
+
+
+def test_parse_duration():
+    assert parse_duration("2m59.56s") == pytest.approx(179.56)
+    assert parse_duration("120ms") == pytest.approx(0.12)
+    assert parse_duration("7") == 7.0
+    assert parse_duration(None) is None
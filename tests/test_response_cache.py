@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from response_cache import SemanticResponseCache, cache_key, distinctive_tokens
+from service_catalog import load_service_catalog
+
+SERVICES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        "library_services.json")
+
+
+@pytest.fixture(scope="module")
+def bucket_weights():
+    return load_service_catalog(SERVICES).semantic_index.bucket_weights
+
+
+def cached(bucket_weights, question):
+    cache = SemanticResponseCache(bucket_weights, maxsize=8)
+    cache.put(question, "answer")
+    return cache
+
+
+def test_cache_key_folds_word_forms():
+    assert cache_key("library opening hours?") == "library open time"
+    assert cache_key("Explain open access journals") == cache_key("open access journals")
+
+
+def test_distinctive_tokens():
+    assert distinctive_tokens(cache_key("can I borrow 3 books")) == {"3"}
+    assert distinctive_tokens(cache_key("is the library open on Friday")) == {"friday"}
+    assert distinctive_tokens(cache_key("can't I borrow books")) == {"t"}
+
+
+@pytest.mark.parametrize("first, second", [
+    ("library opening hours?", "what time does library open"),
+    ("how do I reset my password", "reset password"),
+    ("when does the library close", "library closing time"),
+])
+def test_paraphrase_hits(bucket_weights, first, second):
+    assert cached(bucket_weights, first).get(second) == "answer"
+
+
+@pytest.mark.parametrize("first, second", [
+    ("can I borrow 3 books", "can I borrow 5 books"),
+    ("fine for 2 days late", "fine for 10 days late"),
+    ("is the library open today", "is the library open tomorrow"),
+    ("can I borrow books", "can I not borrow books"),
+    ("how to cite a book in APA style", "how to cite a website in APA style"),
+])
+def test_near_misses_do_not_hit(bucket_weights, first, second):
+    cache = cached(bucket_weights, first)
+    assert cache.get(second) is None
+    assert cache.stats()["misses"] == 1
@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+class Rerun(BaseException):
+    """Stands in for Streamlit's RerunException/StopException"""
+
+
+def wait_for(flights, stat):
+    while not flights.stats()[stat]:
+        time.sleep(0.001)
+
+
+def start_call(flights, fn):
+    """Run flights.do("k", fn) on a thread; returns (thread, outcome dict)"""
+    outcome = {}
+
+    def run():
+        try:
+            outcome["result"] = flights.do("k", fn)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, outcome
+
+
+def test_identical_calls_share_one_result():
+    flights = SingleFlight()
+    release, calls = threading.Event(), []
+
+    def fn(publish):
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    leader, led = start_call(flights, fn)
+    wait_for(flights, "in_flight")
+    waiter, waited = start_call(flights, fn)
+    wait_for(flights, "coalesced")
+    release.set()
+    leader.join()
+    waiter.join()
+    assert led["result"] == waited["result"] == "answer"
+    assert len(calls) == 1
+
+
+def test_exceptions_are_shared_with_waiters():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def fn(publish):
+        release.wait(5)
+        raise ValueError("api error")
+
+    leader, led = start_call(flights, fn)
+    wait_for(flights, "in_flight")
+    waiter, waited = start_call(flights, lambda publish: "unused")
+    wait_for(flights, "coalesced")
+    release.set()
+    leader.join()
+    waiter.join()
+    assert isinstance(led["error"], ValueError)
+    assert waited["error"] is led["error"]
+    assert flights.stats()["shared_errors"] == 1
+
+
+def test_interrupted_leader_hands_over_to_a_waiter():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def interrupted(publish):
+        release.wait(5)
+        raise Rerun()
+
+    leader, led = start_call(flights, interrupted)
+    wait_for(flights, "in_flight")
+    waiter, waited = start_call(flights, lambda publish: "own answer")
+    wait_for(flights, "coalesced")
+    release.set()
+    leader.join()
+    waiter.join()
+    assert isinstance(led["error"], Rerun)
+    assert waited == {"result": "own answer"}
+    stats = flights.stats()
+    assert stats["abandoned"] == 1 and stats["leaders"] == 2 and stats["in_flight"] == 0
+
+
+def test_interrupted_leader_without_waiters_reraises():
+    flights = SingleFlight()
+
+    def interrupted(publish):
+        raise Rerun()
+
+    with pytest.raises(Rerun):
+        flights.do("k", interrupted)
+    assert flights.stats()["in_flight"] == 0
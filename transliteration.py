@@ -0,0 +1,45 @@
+# Romanized Bangla ("Banglish") words students mix into questions. Content
+# words map to the English term used in the service catalog; function words
+# ("kivabe" = how, "korbo" = will do, "kothay" = where) map to "" and are
+# dropped. A spelling that is also an English word ("chai", "ache", "jay",
+# "rum") is listed only when that English sense is unlikely in a library
+# question, since the Banglish reading wins wherever it appears.
+BANGLISH_WORDS = {
+    # content words
+    "boi": "book", "bai": "book", "boier": "book", "boigulo": "book",
+    "haray": "lost", "hariye": "lost", "harano": "lost", "haraise": "lost", "harai": "lost",
+    "hariyeche": "lost", "harayeche": "lost",
+    "ferot": "return", "fert": "return", "joma": "return",
+    "dhar": "borrow", "dhaar": "borrow",
+    "potrika": "newspaper", "potrica": "newspaper", "khobor": "news", "pottrika": "newspaper",
+    "bari": "home", "basha": "home", "basa": "home",
+    "khuji": "search", "khujbo": "search", "khujte": "search", "khoja": "search",
+    "shunbo": "audio", "sunbo": "audio", "shona": "audio",
+    "kokkho": "room", "rum": "room",
+    "jinish": "items", "jinis": "items",
+    "shonod": "certificate", "sonod": "certificate",
+    "puroskar": "award", "puraskar": "award",
+    "gobeshona": "research", "gobesona": "research",
+    "porbo": "read", "porte": "read", "pori": "read",
+    # function words
+    "kivabe": "", "kibhabe": "", "kibabe": "", "kemne": "", "kemon": "", "kothay": "",
+    "kothai": "", "kotay": "", "ki": "", "kii": "", "keno": "", "kno": "", "kobe": "",
+    "koto": "", "ta": "", "ti": "", "er": "", "ke": "", "te": "", "ar": "",
+    "ami": "", "amar": "", "amake": "", "amra": "", "amader": "", "tumi": "", "apni": "",
+    "apnar": "", "theke": "", "diye": "", "dite": "", "dibo": "", "nibo": "", "nite": "",
+    "nebo": "", "korbo": "", "korte": "", "kori": "", "koro": "", "korun": "", "kora": "",
+    "chai": "", "chay": "", "lagbe": "", "lage": "", "pabo": "", "pai": "",
+    "hobe": "", "hoy": "", "ache": "", "achhe": "", "acho": "", "achen": "", "gese": "", "geche": "", "hoise": "",
+    "hoyeche": "", "jabe": "", "jay": "", "ekta": "", "ei": "", "oi": "", "shudhu": "",
+    "plz": "", "pls": "", "bhai": "", "vai": "", "apu": "", "tulbo": "", "tulte": "",
+}
+
+
+def transliterate(words):
+    """Replace known Banglish words with catalog English and drop function words"""
+    out = []
+    for word in words:
+        replacement = BANGLISH_WORDS.get(word, word)
+        if replacement:
+            out.append(replacement)
+    return out